@@ -16,11 +16,27 @@ use std::collections::HashMap;
 
 use std::fs::File;
 use std::io::{self, Read};
+use std::os::unix::fs::FileExt;
 use std::time::{Duration, Instant};
 
 static GLOBAL_HCA_NAME: OnceLock<Mutex<String>> = OnceLock::new();
 static GLOBAL_HCA_SAMPLE_RATE: OnceLock<Mutex<f64>> = OnceLock::new();
 
+fn current_hca_name() -> String {
+    GLOBAL_HCA_NAME
+        .get_or_init(|| Mutex::new(String::new()))
+        .lock()
+        .unwrap()
+        .clone()
+}
+
+fn current_sample_rate() -> f64 {
+    *GLOBAL_HCA_SAMPLE_RATE
+        .get_or_init(|| Mutex::new(0.0))
+        .lock()
+        .unwrap()
+}
+
 #[derive(Default, Debug)]
 pub struct RdmaTable {}
 
@@ -45,9 +61,7 @@ impl CustomTable for RdmaTable {
     }
 
     fn data() -> Vec<datafusion::arrow::array::RecordBatch> {
-        let string = GLOBAL_HCA_NAME.get_or_init(|| Mutex::new(String::new()));
-        let guard = string.lock().unwrap();
-        let hca_name = guard.clone();
+        let hca_name = current_hca_name();
 
         let mut monitor = RDMAMonitor::new(&hca_name);
         monitor.obtain_newset();
@@ -62,31 +76,27 @@ impl CustomTable for RdmaTable {
         let mut np_ecn_marked_roce_packets = datafusion::arrow::array::Float64Builder::new();
         let mut rcv_pkts_rate = datafusion::arrow::array::Float64Builder::new();
         let mut snd_pkts_rate = datafusion::arrow::array::Float64Builder::new();
+        let counters = monitor.read_counters();
         hca_name.append_value(monitor.hca_name.clone());
-        port_rcv_packets.append_value(monitor.read_counter("port_rcv_packets"));
-        port_rcv_data.append_value(monitor.read_counter("port_rcv_data"));
-        port_xmit_packets.append_value(monitor.read_counter("port_xmit_packets"));
-        port_xmit_data.append_value(monitor.read_counter("port_xmit_data"));
-        link_downed.append_value(monitor.read_counter("link_downed"));
-        np_cnp_sent.append_value(monitor.read_counter("np_cnp_sent"));
-        np_ecn_marked_roce_packets.append_value(monitor.read_counter("np_ecn_marked_roce_packets"));
-
-        let f64_val = GLOBAL_HCA_SAMPLE_RATE.get_or_init(|| Mutex::new(0.0));
-        let guard = f64_val.lock().unwrap();
-        let sleep_time = guard.clone() as u64;
+        port_rcv_packets.append_value(counters[PORT_RCV_PACKETS]);
+        port_rcv_data.append_value(counters[PORT_RCV_DATA]);
+        port_xmit_packets.append_value(counters[PORT_XMIT_PACKETS]);
+        port_xmit_data.append_value(counters[PORT_XMIT_DATA]);
+        link_downed.append_value(counters[LINK_DOWNED]);
+        np_cnp_sent.append_value(counters[NP_CNP_SENT]);
+        np_ecn_marked_roce_packets.append_value(counters[NP_ECN_MARKED_ROCE_PACKETS]);
+
+        let sleep_time = current_sample_rate() as u64;
 
         thread::sleep(Duration::from_secs(sleep_time));
 
-        rcv_pkts_rate.append_value(monitor.calculate_rate(
-            Some(monitor.read_counter("port_rcv_packets")),
-            monitor.previous_port_rcv_packets,
+        // the rates only need the two packet counters, skip the other files
+        let [rcv_rate, snd_rate] = monitor.calculate_rates(
+            monitor.read_packet_counters(),
             monitor.last_measurement_time.map(|t| t.elapsed()),
-        ));
-        snd_pkts_rate.append_value(monitor.calculate_rate(
-            Some(monitor.read_counter("port_xmit_packets")),
-            monitor.previous_port_xmit_packets,
-            monitor.last_measurement_time.map(|t| t.elapsed()),
-        ));
+        );
+        rcv_pkts_rate.append_value(rcv_rate);
+        snd_pkts_rate.append_value(snd_rate);
         let rbs = RecordBatch::try_new(
             Self::schema(),
             vec![
@@ -143,19 +153,28 @@ impl EngineCall for RdmaExtension {
         body: &[u8],
     ) -> Result<Vec<u8>, EngineError> {
         if path == "" {
-            let string = GLOBAL_HCA_NAME.get_or_init(|| Mutex::new(String::new()));
-            let guard = string.lock().unwrap();
-            let hca_name = guard.clone();
+            let hca_name = current_hca_name();
 
             let mut monitor = RDMAMonitor::new(&hca_name);
 
             const TEST_CALL: u32 = 5;
+            const SAMPLE_PERIOD: Duration = Duration::from_millis(1000);
             let mut call_cnt = 0;
 
+            // sleep until a fixed deadline so the time spent sampling does
+            // not stretch the period and bias the computed rates
+            let mut deadline = Instant::now();
             while call_cnt < TEST_CALL {
                 call_cnt += 1;
                 monitor.obtain_newset();
-                std::thread::sleep(Duration::from_millis(1000));
+                deadline += SAMPLE_PERIOD;
+                let now = Instant::now();
+                if deadline > now {
+                    std::thread::sleep(deadline - now);
+                } else {
+                    // fell behind after a long stall, restart the schedule
+                    deadline = now;
+                }
             }
             return Ok("RDMA request handled successfully".as_bytes().to_vec());
         }
@@ -203,8 +222,42 @@ impl RdmaExtension {
     }
 }
 
+const PORT_RCV_PACKETS: usize = 0;
+const PORT_RCV_DATA: usize = 1;
+const PORT_XMIT_PACKETS: usize = 2;
+const PORT_XMIT_DATA: usize = 3;
+const LINK_DOWNED: usize = 4;
+const NP_CNP_SENT: usize = 5;
+const NP_ECN_MARKED_ROCE_PACKETS: usize = 6;
+
+const NUM_COUNTERS: usize = 7;
+
+const COUNTER_NAMES: [&str; NUM_COUNTERS] = [
+    "port_rcv_packets",
+    "port_rcv_data",
+    "port_xmit_packets",
+    "port_xmit_data",
+    "link_downed",
+    "np_cnp_sent",
+    "np_ecn_marked_roce_packets",
+];
+
+fn counter_path(hca_name: &str, counter_name: &str) -> String {
+    let dir = if counter_name == "np_cnp_sent" || counter_name == "np_ecn_marked_roce_packets" {
+        "hw_counters"
+    } else {
+        "counters"
+    };
+    format!(
+        "/sys/class/infiniband/{}/ports/1/{}/{}",
+        hca_name, dir, counter_name
+    )
+}
+
 struct RDMAMonitor {
     hca_name: String,
+    // sysfs counters are opened once and re-read from offset 0 on every sample
+    counter_files: Vec<Option<File>>,
     previous_port_rcv_packets: Option<f64>,
     previous_port_xmit_packets: Option<f64>,
     last_measurement_time: Option<Instant>,
@@ -212,29 +265,26 @@ struct RDMAMonitor {
 
 impl RDMAMonitor {
     fn new(hca_name: &str) -> Self {
+        let counter_files = COUNTER_NAMES
+            .iter()
+            .map(|name| File::open(counter_path(hca_name, name)).ok())
+            .collect();
         RDMAMonitor {
             hca_name: hca_name.to_string(),
+            counter_files,
             previous_port_rcv_packets: None,
             previous_port_xmit_packets: None,
             last_measurement_time: None,
         }
     }
 
-    fn read_counter(&self, counter_name: &str) -> f64 {
-        let path = if counter_name == "np_cnp_sent" || counter_name == "np_ecn_marked_roce_packets"
-        {
-            format!(
-                "/sys/class/infiniband/{}/ports/1/hw_counters/{}",
-                self.hca_name, counter_name
-            )
-        } else {
-            format!(
-                "/sys/class/infiniband/{}/ports/1/counters/{}",
-                self.hca_name, counter_name
-            )
+    fn read_counter(&self, index: usize) -> f64 {
+        let counter_name = COUNTER_NAMES[index];
+        let value = match &self.counter_files[index] {
+            Some(file) => read_at_to_f64(file),
+            None => read_file_to_f64(&counter_path(&self.hca_name, counter_name)),
         };
-
-        match read_file_to_f64(&path) {
+        match value {
             Ok(value) => value,
             Err(e) => {
                 println!("Error reading counter {}: {}", counter_name, e);
@@ -243,6 +293,22 @@ impl RDMAMonitor {
         }
     }
 
+    fn read_counters(&self) -> [f64; NUM_COUNTERS] {
+        let mut counters = [0.0; NUM_COUNTERS];
+        for (index, value) in counters.iter_mut().enumerate() {
+            *value = self.read_counter(index);
+        }
+        counters
+    }
+
+    /// Read only the receive and send packet counters.
+    fn read_packet_counters(&self) -> [f64; 2] {
+        [
+            self.read_counter(PORT_RCV_PACKETS),
+            self.read_counter(PORT_XMIT_PACKETS),
+        ]
+    }
+
     fn calculate_rate(
         &self,
         current: Option<f64>,
@@ -266,44 +332,44 @@ impl RDMAMonitor {
         diff / interval
     }
 
+    /// Receive and send packet rates since the previous sample.
+    fn calculate_rates(&self, packets: [f64; 2], interval: Option<Duration>) -> [f64; 2] {
+        let [rcv_packets, xmit_packets] = packets;
+        [
+            self.calculate_rate(Some(rcv_packets), self.previous_port_rcv_packets, interval),
+            self.calculate_rate(
+                Some(xmit_packets),
+                self.previous_port_xmit_packets,
+                interval,
+            ),
+        ]
+    }
+
     fn obtain_newset(&mut self) {
-        let port_rcv_packets = self.read_counter("port_rcv_packets");
-        let port_rcv_data = self.read_counter("port_rcv_data");
-        let port_xmit_packets = self.read_counter("port_xmit_packets");
-        let port_xmit_data = self.read_counter("port_xmit_data");
-        let link_downed = self.read_counter("link_downed");
-        let np_cnp_sent = self.read_counter("np_cnp_sent");
-        let np_ecn_marked_roce_packets = self.read_counter("np_ecn_marked_roce_packets");
+        let counters = self.read_counters();
 
         let current_time = Instant::now();
         let interval = self
             .last_measurement_time
             .map(|t| current_time.duration_since(t));
 
-        let rcv_pkts_rate = self.calculate_rate(
-            Some(port_rcv_packets),
-            self.previous_port_rcv_packets,
+        let [rcv_pkts_rate, snd_pkts_rate] = self.calculate_rates(
+            [counters[PORT_RCV_PACKETS], counters[PORT_XMIT_PACKETS]],
             interval,
         );
 
-        let snd_pkts_rate = self.calculate_rate(
-            Some(port_xmit_packets),
-            self.previous_port_xmit_packets,
-            interval,
-        );
-
-        self.previous_port_rcv_packets = Some(port_rcv_packets);
-        self.previous_port_xmit_packets = Some(port_xmit_packets);
+        self.previous_port_rcv_packets = Some(counters[PORT_RCV_PACKETS]);
+        self.previous_port_xmit_packets = Some(counters[PORT_XMIT_PACKETS]);
         self.last_measurement_time = Some(current_time);
 
         let new_data = [
-            port_rcv_packets as f64,
-            port_rcv_data as f64,
-            port_xmit_packets as f64,
-            port_xmit_data as f64,
-            link_downed as f64,
-            np_cnp_sent as f64,
-            np_ecn_marked_roce_packets as f64,
+            counters[PORT_RCV_PACKETS],
+            counters[PORT_RCV_DATA],
+            counters[PORT_XMIT_PACKETS],
+            counters[PORT_XMIT_DATA],
+            counters[LINK_DOWNED],
+            counters[NP_CNP_SENT],
+            counters[NP_ECN_MARKED_ROCE_PACKETS],
             rcv_pkts_rate,
             snd_pkts_rate,
         ];
@@ -312,12 +378,85 @@ impl RDMAMonitor {
     }
 }
 
+fn read_at_to_f64(file: &File) -> io::Result<f64> {
+    let mut buf = [0u8; 32];
+    let n = file.read_at(&mut buf, 0)?;
+    parse_counter(&buf[..n])
+}
+
 fn read_file_to_f64(path: &str) -> io::Result<f64> {
-    let mut file = File::open(path)?;
-    let mut contents = String::new();
-    file.read_to_string(&mut contents)?;
-    contents
-        .trim()
-        .parse::<f64>()
-        .map_err(|e| io::Error::new(io::ErrorKind::InvalidData, e))
+    let mut buf = [0u8; 32];
+    let n = File::open(path)?.read(&mut buf)?;
+    parse_counter(&buf[..n])
+}
+
+/// Parse the decimal counter value of a sysfs file without building a string.
+///
+/// The value may be surrounded by ASCII whitespace (sysfs ends it with a
+/// newline); anything else, or a value that overflows `u64`, is invalid.
+fn parse_counter(buf: &[u8]) -> io::Result<f64> {
+    let start = buf
+        .iter()
+        .position(|b| !b.is_ascii_whitespace())
+        .unwrap_or(buf.len());
+    let buf = &buf[start..];
+    let end = buf
+        .iter()
+        .position(|b| !b.is_ascii_digit())
+        .unwrap_or(buf.len());
+    let (digits, rest) = buf.split_at(end);
+    if digits.is_empty() {
+        return Err(io::Error::new(
+            io::ErrorKind::InvalidData,
+            "counter file holds no value",
+        ));
+    }
+    if !rest.iter().all(|b| b.is_ascii_whitespace()) {
+        return Err(io::Error::new(
+            io::ErrorKind::InvalidData,
+            "counter file holds trailing data",
+        ));
+    }
+    let value = digits
+        .iter()
+        .try_fold(0u64, |v, b| {
+            v.checked_mul(10)?.checked_add((b - b'0') as u64)
+        })
+        .ok_or_else(|| io::Error::new(io::ErrorKind::InvalidData, "counter value overflows u64"))?;
+    Ok(value as f64)
+}
+
+#[cfg(test)]
+mod test {
+    use super::parse_counter;
+    use std::io;
+
+    fn invalid(buf: &[u8]) -> bool {
+        parse_counter(buf).unwrap_err().kind() == io::ErrorKind::InvalidData
+    }
+
+    #[test]
+    fn test_parse_counter() {
+        assert_eq!(parse_counter(b"42\n").unwrap(), 42.0);
+        assert_eq!(parse_counter(b"  7").unwrap(), 7.0);
+        assert_eq!(
+            parse_counter(b"18446744073709551615\n").unwrap(),
+            u64::MAX as f64
+        );
+        assert!(invalid(b""));
+        assert!(invalid(b"\n"));
+    }
+
+    #[test]
+    fn test_parse_counter_overflow() {
+        assert!(invalid(b"18446744073709551616\n"));
+        assert!(invalid(b"99999999999999999999999999999999"));
+    }
+
+    #[test]
+    fn test_parse_counter_trailing_data() {
+        assert!(invalid(b"12abc\n"));
+        assert!(invalid(b"1 2\n"));
+        assert!(invalid(b"-1\n"));
+    }
 }
@@ -23,6 +23,18 @@ fn value_to_object(py: Python, v: &Ele) -> PyObject {
     ret.map(|x| x.unbind()).unwrap_or(py.None())
 }
 
+fn object_to_value(py: Python, v: &PyObject) -> Ele {
+    if let Ok(v) = v.extract::<i64>(py) {
+        Ele::I64(v)
+    } else if let Ok(v) = v.extract::<f64>(py) {
+        Ele::F64(v)
+    } else if let Ok(v) = v.extract::<String>(py) {
+        Ele::Text(v)
+    } else {
+        Ele::Nil
+    }
+}
+
 #[pyclass]
 pub struct PyExternalTableConfig {
     #[pyo3(get)]
@@ -203,17 +215,7 @@ impl ExternalTable {
         let values: Vec<Ele> = Python::with_gil(|py| {
             values
                 .into_iter()
-                .map(|v| {
-                    if let Ok(v) = v.extract::<i64>(py) {
-                        Ele::I64(v)
-                    } else if let Ok(v) = v.extract::<f64>(py) {
-                        Ele::F64(v)
-                    } else if let Ok(v) = v.extract::<String>(py) {
-                        Ele::Text(v)
-                    } else {
-                        Ele::Nil
-                    }
-                })
+                .map(|v| object_to_value(py, &v))
                 .collect()
         });
         match self.0.lock().unwrap().append(t.into(), values) {
@@ -222,6 +224,32 @@ impl ExternalTable {
         }
     }
 
+    /// Append several rows with one timestamp, converting them under a single
+    /// GIL acquisition and writing them under a single lock of the table.
+    fn append_many(&mut self, rows: Vec<Vec<PyObject>>) -> PyResult<()> {
+        if rows.iter().any(|values| values.len() != self.1) {
+            return Err(pyo3::exceptions::PyValueError::new_err(
+                "column count mismatch",
+            ));
+        }
+        let t = std::time::SystemTime::now()
+            .duration_since(std::time::UNIX_EPOCH)
+            .unwrap()
+            .as_micros() as i64;
+        let rows: Vec<Vec<Ele>> = Python::with_gil(|py| {
+            rows.iter()
+                .map(|values| values.iter().map(|v| object_to_value(py, v)).collect())
+                .collect()
+        });
+        let mut ts = self.0.lock().unwrap();
+        for values in rows {
+            if let Err(e) = ts.append(t.into(), values) {
+                return Err(pyo3::exceptions::PyValueError::new_err(e.to_string()));
+            }
+        }
+        Ok(())
+    }
+
     fn append_ts(&mut self, t: i64, values: Vec<PyObject>) -> PyResult<()> {
         if values.len() != self.1 {
             return Err(pyo3::exceptions::PyValueError::new_err(
@@ -231,17 +259,7 @@ impl ExternalTable {
         let values: Vec<Ele> = Python::with_gil(|py| {
             values
                 .into_iter()
-                .map(|v| {
-                    if let Ok(v) = v.extract::<i64>(py) {
-                        Ele::I64(v)
-                    } else if let Ok(v) = v.extract::<f64>(py) {
-                        Ele::F64(v)
-                    } else if let Ok(v) = v.extract::<String>(py) {
-                        Ele::Text(v)
-                    } else {
-                        Ele::Nil
-                    }
-                })
+                .map(|v| object_to_value(py, &v))
                 .collect()
         });
         let _ = self.0.lock().unwrap().append(t.into(), values);
@@ -338,6 +356,26 @@ table = probing.ExternalTable.get_or_create("table2", ["a", "b"])
         });
     }
 
+    #[test]
+    fn test_append_many_in_python() {
+        setup();
+        Python::with_gil(|py| {
+            py.run(
+                c_str!(
+                    r#"
+import probing
+table = probing.ExternalTable.get_or_create("table4", ["a", "b"])
+table.append_many([(1, 2.0), (3, "x")])
+assert [vals for _, vals in table.take()] == [[1, 2.0], [3, "x"]]
+"#
+                ),
+                None,
+                None,
+            )
+            .unwrap();
+        });
+    }
+
     #[test]
     fn test_drop_table_in_python() {
         setup();
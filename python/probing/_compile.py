@@ -0,0 +1,42 @@
+"""Compile cache shared by the REPL consoles."""
+
+import __future__
+from collections import OrderedDict
+from types import CodeType
+
+# compiled code of recently run inputs, keyed by source and compiler flags,
+# least recently used first; repeated commands such as health checks skip
+# parsing and compilation
+_CODE_CACHE: "OrderedDict[tuple, CodeType]" = OrderedDict()
+_CODE_CACHE_SIZE = 256
+
+# compiler flags of all __future__ features
+_FUTURE_FLAGS = 0
+for _name in __future__.all_feature_names:
+    _FUTURE_FLAGS |= getattr(__future__, _name).compiler_flag
+del _name
+
+
+def compile_cached(compiler, source: str, filename: str, symbol: str):
+    """Return ``compiler(source, filename, symbol)``, reusing recent results.
+
+    ``compiler`` is a ``codeop.CommandCompiler``. Incomplete input compiles to
+    None and is never cached.
+    """
+    # __future__ imports change the compiler flags, so they are part of the key
+    flags = compiler.compiler.flags
+    key = (source, filename, symbol, flags)
+    code = _CODE_CACHE.get(key)
+    if code is None:
+        code = compiler(source, filename, symbol)
+        if code is None:
+            return None
+        if len(_CODE_CACHE) >= _CODE_CACHE_SIZE:
+            _CODE_CACHE.popitem(last=False)
+        _CODE_CACHE[key] = code
+    else:
+        _CODE_CACHE.move_to_end(key)
+        # compiling records the __future__ imports of the input in the
+        # compiler's flags, so later input sees them; do the same on a hit
+        compiler.compiler.flags = flags | (code.co_flags & _FUTURE_FLAGS)
+    return code
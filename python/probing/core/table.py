@@ -1,5 +1,6 @@
 import dataclasses
 import functools
+import operator
 import re
 from typing import Any, Optional, Type, Union
 
@@ -47,6 +48,8 @@ def table(name_or_class: Optional[Union[str, Type[Any]]] = None):
         Adds a single instance to the table.
     append_many(instances) : classmethod
         Adds multiple instances to the table.
+    append_columns(columns) : classmethod
+        Adds rows given as one sequence per field, in field order.
     take(n) : classmethod
         Retrieves n rows from the table.
     drop() : classmethod
@@ -92,6 +95,17 @@ def table(name_or_class: Optional[Union[str, Type[Any]]] = None):
         table_name = name or camel_to_snake(cls.__name__)
         fields = [f.name for f in dataclasses.fields(cls)]
 
+        # table columns hold scalars only, so a flat attribute read replaces
+        # the recursive copy done by dataclasses.astuple
+        if len(fields) == 1:
+            getter = operator.attrgetter(fields[0])
+
+            def to_tuple(obj):
+                return (getter(obj),)
+
+        else:
+            to_tuple = operator.attrgetter(*fields)
+
         @functools.wraps(cls.__init__)
         def init_table():
             try:
@@ -103,35 +117,39 @@ def table(name_or_class: Optional[Union[str, Type[Any]]] = None):
             except Exception:
                 table = probing.ExternalTable(table_name, fields)
             cache[cls] = table
+            # bound on the class so the append paths skip the cache lookup
+            cls._probing_table = table
             return table
 
         @classmethod
         def append(cls, self):
-            table = cache[cls]
-            table.append(dataclasses.astuple(self))
+            cls._probing_table.append(to_tuple(self))
 
         @classmethod
         def append_many(cls, self):
-            table = cache[cls]
-            table.append_many([dataclasses.astuple(i) for i in self])
+            cls._probing_table.append_many([to_tuple(i) for i in self])
+
+        @classmethod
+        def append_columns(cls, columns):
+            cls._probing_table.append_many(list(zip(*columns)))
 
         @classmethod
         def take(cls, n):
-            table = cache[cls]
-            return table.take(n)
+            return cls._probing_table.take(n)
 
         @classmethod
         def drop(cls):
-            table = cache[cls]
-            del cache[cls]
+            table = cache.pop(cls)
+            del cls._probing_table
             table.drop(table_name)
 
         def save(self):
-            cls.append(self)
+            cls._probing_table.append(to_tuple(self))
 
         setattr(cls, "init_table", init_table)
         setattr(cls, "append", append)
         setattr(cls, "append_many", append_many)
+        setattr(cls, "append_columns", append_columns)
         setattr(cls, "take", take)
         setattr(cls, "drop", drop)
         setattr(cls, "save", save)
@@ -1,4 +1,22 @@
+import sys
+import threading
+import weakref
+
+# ids of optimizers that already have probing hooks installed
 hooks = {}
+_hooks_lock = threading.Lock()
+
+# Environment variable names, interned once so lookups in os.environ
+# compare by pointer instead of re-hashing the key on every read.
+_E_MODE = sys.intern("PROBING_TORCH_PROFILING_MODE")
+_E_RATE = sys.intern("PROBING_TORCH_SAMPLE_RATE")
+_E_TRACEPY = sys.intern("PROBING_TORCH_TRACEPY")
+_E_SYNC = sys.intern("PROBING_TORCH_SYNC")
+_E_WATCH_VARS = sys.intern("PROBING_TORCH_WATCH_VARS")
+_E_MEM_EVERY = sys.intern("PROBING_TORCH_MEM_EVERY")
+_E_MAX_MODULES = sys.intern("PROBING_TORCH_MAX_MODULES")
+_E_COLL_ENABLE = sys.intern("PB_COLL_ENABLE_TRACE")
+_E_COLL_VERBOSE = sys.intern("PB_COLL_TRACE_VERBOSE")
 
 
 def is_true(value):
@@ -8,38 +26,50 @@ def is_true(value):
 
 
 def optimizer_step_post_hook(optimizer, *args, **kwargs):
-    global hooks
-    if optimizer not in hooks:
-        from probing.profiling.torch_probe import TorchProbe
-        from probing.profiling.torch import install_hooks
-        from probing.profiling.torch.module_utils import get_toplevel_module
+    # fast path: no locking once the optimizer has been instrumented
+    if id(optimizer) in hooks:
+        return
+    with _hooks_lock:
+        if id(optimizer) in hooks:
+            return
+        _install_optimizer_hooks(optimizer)
+
 
-        import os
+def _install_optimizer_hooks(optimizer):
+    from probing.profiling.torch_probe import TorchProbe
+    from probing.profiling.torch import install_hooks
+    from probing.profiling.torch.module_utils import get_toplevel_module
 
-        mode = os.getenv("PROBING_TORCH_PROFILING_MODE", "ordered")
-        rate = float(os.getenv("PROBING_TORCH_SAMPLE_RATE", "0.05"))
-        tracepy = is_true(os.getenv("PROBING_TORCH_TRACEPY", "False"))
-        sync = is_true(os.getenv("PROBING_TORCH_SYNC", "False"))
-        exprs = os.getenv("PROBING_TORCH_WATCH_VARS", "")
+    import os
+
+    mode = os.getenv(_E_MODE, "ordered")
+    rate = float(os.getenv(_E_RATE, "0.05"))
+    tracepy = is_true(os.getenv(_E_TRACEPY, "False"))
+    sync = is_true(os.getenv(_E_SYNC, "False"))
+    exprs = os.getenv(_E_WATCH_VARS, "")
+    mem_every = int(os.getenv(_E_MEM_EVERY, "1"))
+    max_mods = int(os.getenv(_E_MAX_MODULES, "0"))
 
-        tracer = TorchProbe(exprs=exprs)
+    tracer = TorchProbe(exprs=exprs, mem_every=mem_every, max_mods=max_mods)
 
-        models = get_toplevel_module()
-        for model in models:
-            install_hooks(model, tracer=tracer)
-        install_hooks(opt=optimizer, tracer=tracer)
-        hooks[optimizer] = True
+    models = get_toplevel_module()
+    for model in models:
+        install_hooks(model, tracer=tracer)
+    install_hooks(opt=optimizer, tracer=tracer)
+    oid = id(optimizer)
+    hooks[oid] = True
+    weakref.finalize(optimizer, hooks.pop, oid, None)
 
-        from probing.profiling.torch import next_step
+    from probing.profiling.torch import next_step
 
-        next_step()
+    next_step()
 
 
 def collective_hook():
 
     import os
-    enble = os.getenv("PB_COLL_ENABLE_TRACE", "False") # set to True to enable collective profiling
-    trace_verbose = os.getenv("PB_COLL_TRACE_VERBOSE", "False")  # set to True to see the detailed trace output
+    enble = os.getenv(_E_COLL_ENABLE, "False") # set to True to enable collective profiling
+    trace_verbose = os.getenv(_E_COLL_VERBOSE, "False")  # set to True to see the detailed trace output
 
     if is_true(enble):
         from probing.profiling.collective import trace_all_collectives
@@ -59,3 +89,8 @@ def deinit():
     from probing.profiling.torch import uninstall_hooks
 
     uninstall_hooks()
+
+    torch_probe = sys.modules.get("probing.profiling.torch_probe")
+    if torch_probe is not None:
+        for probe in list(torch_probe._PROBES):
+            probe.uninstall_exception_tracer()
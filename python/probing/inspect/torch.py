@@ -1,3 +1,4 @@
+import heapq
 import weakref
 import time
 
@@ -5,23 +6,28 @@ tensor_cache = {}
 module_cache = {}
 optim_cache = {}
 
-_last_full_refresh_time = 0
+_last_full_refresh_time = float("-inf")
 FULL_REFRESH_INTERVAL_SECONDS = 5 * 60
+DEFAULT_LIMIT = 500
 
 
 def update_cache(x):
     import torch
 
+    return _update_cache(x, torch.Tensor, torch.nn.Module, torch.optim.Optimizer)
+
+
+def _update_cache(x, tensor_type, module_type, optim_type):
     idx = id(x)
-    if isinstance(x, torch.Tensor):
+    if isinstance(x, tensor_type):
         if idx not in tensor_cache:
             tensor_cache[idx] = weakref.ref(x)
         return tensor_cache[idx]
-    if isinstance(x, torch.nn.Module):
+    if isinstance(x, module_type):
         if idx not in module_cache:
             module_cache[idx] = weakref.ref(x)
         return module_cache[idx]
-    if isinstance(x, torch.optim.Optimizer):
+    if isinstance(x, optim_type):
         if idx not in optim_cache:
             optim_cache[idx] = weakref.ref(x)
         return optim_cache[idx]
@@ -30,66 +36,94 @@ def update_cache(x):
 def refresh_cache():
     import gc
 
+    import torch
+
+    # resolve torch types once instead of once per tracked object
+    tensor_type = torch.Tensor
+    module_type = torch.nn.Module
+    optim_type = torch.optim.Optimizer
     for obj in gc.get_objects():
-        update_cache(obj)
+        _update_cache(obj, tensor_type, module_type, optim_type)
     global _last_full_refresh_time
-    _last_full_refresh_time = time.time()
+    _last_full_refresh_time = time.monotonic()
 
 def _ensure_cache_updated():
-    now = time.time()
+    now = time.monotonic()
     if now - _last_full_refresh_time > FULL_REFRESH_INTERVAL_SECONDS:
         refresh_cache()
 
-def _build_active_list_and_clean_cache(cache_dict):
+def _build_active_list_and_clean_cache(cache_dict, limit=DEFAULT_LIMIT, offset=0):
     """
     Builds a list of active items from the cache and cleans dead references.
     Returns the list of active items and a boolean indicating if dead refs were found.
+
+    Items are ordered by id, and only the ``limit`` items after ``offset`` are
+    materialized, so listing a huge model stays bounded in memory. Pass
+    ``limit=None`` to return everything.
     """
-    active_items = []
+    live_ids = []
     found_dead_ref = False
     # Iterate over a copy of items for safe deletion from the original cache_dict
     for k, v_ref in list(cache_dict.items()):
-        obj = v_ref()  # Dereference the weakref
+        if v_ref() is not None:
+            live_ids.append(k)
+        else:
+            # Object has been garbage collected, remove from cache
+            del cache_dict[k]
+            found_dead_ref = True
+
+    if limit is None:
+        page = sorted(live_ids)[offset:]
+    else:
+        page = heapq.nsmallest(offset + limit, live_ids)[offset:]
+
+    active_items = []
+    for k in page:
+        obj = cache_dict[k]()  # Dereference the weakref
         if obj is not None:
             active_items.append({
                 "id": k,
                 "type": type(obj).__name__,
                 "value": obj,
             })
-        else:
-            # Object has been garbage collected, remove from cache
-            del cache_dict[k]
-            found_dead_ref = True
     return active_items, found_dead_ref
 
-def get_torch_modules():
+def get_torch_modules(limit=DEFAULT_LIMIT, offset=0):
     _ensure_cache_updated()  # Time-based refresh check
 
-    active_items, found_dead_ref = _build_active_list_and_clean_cache(module_cache)
+    active_items, found_dead_ref = _build_active_list_and_clean_cache(
+        module_cache, limit, offset
+    )
 
     if found_dead_ref:
         # print("Dead ref found in module_cache, triggering refresh_cache()") # For debugging
         refresh_cache()  # Force a full refresh
         # Rebuild the list from the now-refreshed cache
-        active_items, _ = _build_active_list_and_clean_cache(module_cache)
+        active_items, _ = _build_active_list_and_clean_cache(
+            module_cache, limit, offset
+        )
     
     return active_items
     
-def get_torch_tensors():
+def get_torch_tensors(limit=DEFAULT_LIMIT, offset=0):
     _ensure_cache_updated()  # Time-based refresh check
 
-    active_items, _ = _build_active_list_and_clean_cache(tensor_cache)
+    active_items, _ = _build_active_list_and_clean_cache(tensor_cache, limit, offset)
     return active_items
 
-def get_torch_optimizers():
+def get_torch_optimizers(limit=DEFAULT_LIMIT, offset=0):
     _ensure_cache_updated()  # Time-based refresh check
 
-    active_items, found_dead_ref = _build_active_list_and_clean_cache(optim_cache)
+    active_items, found_dead_ref = _build_active_list_and_clean_cache(
+        optim_cache, limit, offset
+    )
 
     if found_dead_ref:
         # print("Dead ref found in optim_cache, triggering refresh_cache()") # For debugging
         refresh_cache()  # Force a full refresh
         # Rebuild the list from the now-refreshed cache
-        active_items, _ = _build_active_list_and_clean_cache(optim_cache)
+        active_items, _ = _build_active_list_and_clean_cache(
+            optim_cache, limit, offset
+        )
         
     return active_items
\ No newline at end of file
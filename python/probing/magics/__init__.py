@@ -218,6 +218,9 @@ class CodeExecutor:
 
 import code
 
+from .._compile import compile_cached
+
+
 class DebugConsole(code.InteractiveConsole):
     def __init__(self):
         self.code_executor = CodeExecutor()
@@ -225,7 +228,7 @@ class DebugConsole(code.InteractiveConsole):
 
     def runsource(self, source):
         try:
-            code = self.compile(source, "<input>", "single")
+            code = compile_cached(self.compile, source, "<input>", "single")
         except (OverflowError, SyntaxError, ValueError):
             print("Error in code:\n", source)
             retval = self.code_executor.execute(source)
@@ -0,0 +1,143 @@
+"""Weak registries of live torch objects used by the magics.
+
+``gc.get_objects()`` walks every object tracked by the collector, which takes
+seconds in a large training process. The registries below keep weak references
+to ``nn.Module`` and ``Tensor`` instances so that queries only touch objects of
+the requested type.
+
+Modules register themselves through a wrapped ``nn.Module.__init__``. This is
+a process-wide patch of ``torch.nn.Module``, installed by the first magic that
+queries the registry and removed again by ``uninstall()``. Modules built
+without calling ``__init__``, e.g. by ``copy.deepcopy`` or ``pickle.loads``,
+are not seen by it; ``module_by_id`` falls back to a heap scan when an id is
+not found, and ``modules(refresh=True)`` rescans on request.
+
+Tensors are mostly created in C++ without passing through a Python
+constructor, so the tensor registry is refreshed from a heap scan at most once
+every ``TENSOR_RESCAN_INTERVAL_SECONDS``, or when asked with ``refresh=True``.
+"""
+
+import functools
+import gc
+import threading
+import time
+import weakref
+
+# id(obj) -> obj, entries vanish when the object is collected
+MODULES = weakref.WeakValueDictionary()
+TENSORS = weakref.WeakValueDictionary()
+
+# short enough that new tensors show up on the next query, long enough that
+# the burst of queries behind one UI refresh shares a single heap scan
+TENSOR_RESCAN_INTERVAL_SECONDS = 1.0
+
+_installed = False
+_orig_init = None
+_last_tensor_scan = float("-inf")
+# serializes install and heap scans between REPL and HTTP handler threads
+_lock = threading.RLock()
+
+
+def install():
+    """Start tracking modules and seed both registries from one heap scan.
+
+    This wraps ``torch.nn.Module.__init__`` for the whole process; call
+    ``uninstall()`` to restore it.
+    """
+    global _installed, _orig_init
+    if _installed:
+        return
+    with _lock:
+        if _installed:
+            return
+        import torch
+
+        orig_init = _orig_init = torch.nn.Module.__init__
+
+        @functools.wraps(orig_init)
+        def __init__(self, *args, **kwargs):
+            orig_init(self, *args, **kwargs)
+            MODULES[id(self)] = self
+
+        torch.nn.Module.__init__ = __init__
+        _scan_heap()
+        _installed = True
+
+
+def uninstall():
+    """Restore ``torch.nn.Module.__init__`` and clear the registries."""
+    global _installed, _orig_init
+    with _lock:
+        if not _installed:
+            return
+        import torch
+
+        torch.nn.Module.__init__ = _orig_init
+        _orig_init = None
+        _installed = False
+        MODULES.clear()
+        TENSORS.clear()
+
+
+def _scan_heap():
+    global _last_tensor_scan
+    import torch
+
+    module_type = torch.nn.Module
+    tensor_type = torch.Tensor
+    with _lock:
+        for obj in gc.get_objects():
+            if isinstance(obj, tensor_type):
+                TENSORS[id(obj)] = obj
+            elif isinstance(obj, module_type):
+                MODULES[id(obj)] = obj
+        _last_tensor_scan = time.monotonic()
+
+
+def modules(refresh=False):
+    """Return all live ``nn.Module`` instances, rescanning the heap if asked."""
+    install()
+    if refresh:
+        _scan_heap()
+    return list(MODULES.values())
+
+
+def module_by_id(mid):
+    """Return the live ``nn.Module`` whose ``id()`` is ``mid``, or None.
+
+    A miss falls back to a heap scan, so that modules created without
+    ``__init__`` (deepcopy, unpickling) are found too.
+    """
+    install()
+    m = MODULES.get(mid)
+    if m is None:
+        _scan_heap()
+        m = MODULES.get(mid)
+    return m
+
+
+def tensors(refresh=False):
+    """Return all live tensors, rescanning the heap if the registry is stale."""
+    install()
+    if refresh or time.monotonic() - _last_tensor_scan > TENSOR_RESCAN_INTERVAL_SECONDS:
+        _scan_heap()
+    return list(TENSORS.values())
+
+
+def toplevel_modules(objs=None, refresh=False):
+    """Return the modules in ``objs`` that are not a child of another module.
+
+    Every live module is in the registry, so marking the direct children of
+    each one is enough; no recursive walk is needed. The children are read
+    from ``_modules`` directly, as ``children()`` builds a generator and a
+    memo set per module.
+    """
+    if objs is None:
+        objs = modules(refresh=refresh)
+    children = set()
+    add = children.add
+    for obj in objs:
+        for child in obj._modules.values():
+            if child is not None:
+                add(id(child))
+    return [obj for obj in objs if id(obj) not in children]
@@ -0,0 +1,43 @@
+"""Helpers shared by the object-listing magics."""
+
+try:
+    import orjson
+
+    def json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+
+except ImportError:
+    import json
+
+    def json_dumps(obj):
+        return json.dumps(obj, indent=2)
+
+
+# str() of dtypes and devices, computed once per distinct value
+_STR_CACHE = {}
+
+
+def cached_str(x):
+    s = _STR_CACHE.get(x)
+    if s is None:
+        s = _STR_CACHE[x] = str(x)
+    return s
+
+
+class _obj_:
+    """Wraps a query result so the REPL echo prints it as JSON.
+
+    The encoded text is kept, so displaying the same result again does not
+    re-encode it.
+    """
+
+    __slots__ = ("_obj", "_text")
+
+    def __init__(self, obj):
+        self._obj = obj
+        self._text = None
+
+    def __repr__(self):
+        if self._text is None:
+            self._text = json_dumps(self._obj)
+        return self._text
@@ -2,15 +2,26 @@ from typing import Any
 from IPython.core.magic import Magics, magics_class, line_magic
 import urllib.parse
 import gc
-import json
-import torch
+import itertools
+import sys
+
+from . import _registry
+from ._utils import _obj_, cached_str
+
+_BUILTIN_PREFIXES = (
+    "builtins.",
+    "codeop",
+    "_io.",
+    "typing.",
+    "_asyncio.",
+    "asyncio.",
+    "six.",
+    "prompt_toolkit.",
+    "_collections.",
+    "_ast.",
+    "ast.",
+)
 
-class _obj_:
-    def __init__(self, obj):
-        self._obj = obj
-
-    def __repr__(self):
-        return json.dumps(self._obj, indent=2)
 
 @magics_class
 class HandleMagic(Magics):
@@ -18,44 +29,43 @@ class HandleMagic(Magics):
     def parse_query(self, query: str) -> Any:
         return urllib.parse.parse_qs(query)
 
+    # type -> (interned qualified type name, passes the builtin blacklist)
+    _TYPE_CACHE = {}
+
+    def _type_info(self, obj):
+        t = type(obj)
+        cached = self._TYPE_CACHE.get(t)
+        if cached is None:
+            try:
+                typ = f"{t.__module__}.{t.__name__}"
+            except:
+                typ = str(t)
+            typ = sys.intern(typ)
+            cached = (typ, not typ.startswith(_BUILTIN_PREFIXES))
+            self._TYPE_CACHE[t] = cached
+        return cached
+
     def _filter_obj_type(self, obj, type_selector=None, no_builtin=True):
-        typ = self._get_obj_type(obj)
-        if no_builtin and (
-            typ.startswith("builtins.")
-            or typ.startswith("codeop")
-            or typ.startswith("_io.")
-            or typ.startswith("typing.")
-            or typ.startswith("_asyncio.")
-            or typ.startswith("asyncio.")
-            or typ.startswith("six.")
-            or typ.startswith("prompt_toolkit.")
-            or typ.startswith("_collections.")
-            or typ.startswith("_ast.")
-            or typ.startswith("ast.")
-        ):
+        typ, allowed = self._type_info(obj)
+        if no_builtin and not allowed:
             return False
         if type_selector is not None:
             return typ == type_selector
         return True
 
     def _get_obj_type(self, obj):
-        try:
-            m = type(obj).__module__
-            n = type(obj).__name__
-            return f"{m}.{n}"
-        except:
-            return str(type(obj))
+        return self._type_info(obj)[0]
 
     def _get_obj_repr(self, obj, value=False):
         typ = self._get_obj_type(obj)
         ret = {
             "id": id(obj),
-            "class": self._get_obj_type(obj),
+            "class": typ,
         }
         if typ == "torch.Tensor":
             ret["shape"] = str(obj.shape)
-            ret["dtype"] = str(obj.dtype)
-            ret["device"] = str(obj.device)
+            ret["dtype"] = cached_str(obj.dtype)
+            ret["device"] = cached_str(obj.device)
         if value:
             ret["value"] = str(obj)
         return ret
@@ -67,53 +77,74 @@ class HandleMagic(Magics):
         type_selector = args.get("type", None)
         limit = args.get("limit", None)
         limit = int(limit) if limit is not None else None
-
-        class _obj_list_:
-            def __init__(self, objs):
-                self._objs = objs
-
-            def __repr__(self):
-                return json.dumps(self._objs, indent=2)
-
-        objs = gc.get_objects()
-        objs = [obj for obj in objs if self._filter_obj_type(obj, type_selector)]
-        objs = objs[:limit] if limit is not None else objs
-        return _obj_list_([self._get_obj_repr(obj) for obj in objs])
+        refresh = args.get("refresh", "False").lower() in ("true", "1", "t")
+
+        if type_selector == "torch.Tensor":
+            objs = _registry.tensors(refresh=refresh)
+        else:
+            objs = gc.get_objects()
+        # inlined _filter_obj_type: one cached type lookup per heap object,
+        # and the scan stops as soon as ``limit`` objects have matched
+        type_info = self._type_info
+        if type_selector is None:
+            objs = (obj for obj in objs if type_info(obj)[1])
+        else:
+            wanted = (type_selector, True)
+            objs = (obj for obj in objs if type_info(obj) == wanted)
+        objs = itertools.islice(objs, limit)
+
+        # most heap objects only need id and class; build those rows directly
+        # and leave the tensor fields to _get_obj_repr
+        rows = []
+        append = rows.append
+        for obj in objs:
+            typ = type_info(obj)[0]
+            if typ == "torch.Tensor":
+                append(self._get_obj_repr(obj))
+            else:
+                append({"id": id(obj), "class": typ})
+        return _obj_(rows)
 
     @line_magic
     def get_torch_tensors(self, line: str):
-        """Get torch tensors from memory."""
+        """Get torch tensors from memory.
+
+        Usage:
+            %get_torch_tensors limit=None refresh=False
+        """
         args = dict(item.split("=") for item in line.split()) if line else {}
         limit = args.get("limit", None)
-        objs = gc.get_objects()
-        objs = [obj for obj in objs if self._filter_obj_type(obj, "torch.Tensor")]
-        objs = objs[: int(limit)] if limit is not None else objs
+        limit = int(limit) if limit is not None else None
+        refresh = args.get("refresh", "False").lower() in ("true", "1", "t")
+
+        import torch
+
+        objs = (
+            obj
+            for obj in _registry.tensors(refresh=refresh)
+            if type(obj) is torch.Tensor
+        )
+        objs = itertools.islice(objs, limit)
         return _obj_([self._get_obj_repr(obj) for obj in objs])
 
     @line_magic
     def get_torch_modules(self, line: str):
-        """Get torch modules from memory."""
+        """Get torch modules from memory.
+
+        Usage:
+            %get_torch_modules limit=None toplevel=False refresh=False
+        """
         args = dict(item.split("=") for item in line.split()) if line else {}
         limit = args.get("limit", None)
         toplevel = args.get("toplevel", "False").lower() in ("true", "1", "t")
+        refresh = args.get("refresh", "False").lower() in ("true", "1", "t")
 
         limit = int(limit) if limit is not None else None
 
-        objs = gc.get_objects()
-        objs = [obj for obj in objs if isinstance(obj, torch.nn.Module)]
-
-        children = set()
-
-        def walk(obj):
-            if hasattr(obj, "children"):
-                for child in obj.children():
-                    children.add(id(child))
-                    walk(child)
-
-        for obj in objs:
-            walk(obj)
         if toplevel:
-            objs = [obj for obj in objs if id(obj) not in children]
+            objs = _registry.toplevel_modules(refresh=refresh)
+        else:
+            objs = _registry.modules(refresh=refresh)
 
-        objs = objs[: int(limit)] if limit is not None else objs
+        objs = itertools.islice(objs, limit)
         return _obj_([self._get_obj_repr(obj, value=True) for obj in objs])
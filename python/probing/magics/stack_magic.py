@@ -1,61 +1,139 @@
 from IPython.core.magic import Magics, magics_class, line_magic
-import traceback
+import reprlib
 import sys
-import json
+
+from ._utils import _obj_, cached_str
+
+# type -> interned "module.name"
+_TYPE_NAME_CACHE = {}
+
 
 def _get_obj_type(obj):
-    try:
-        m = type(obj).__module__
-        n = type(obj).__name__
-        return f"{m}.{n}"
-    except Exception:
-        return str(type(obj))
+    t = type(obj)
+    typ = _TYPE_NAME_CACHE.get(t)
+    if typ is None:
+        try:
+            typ = f"{t.__module__}.{t.__name__}"
+        except Exception:
+            typ = str(t)
+        typ = _TYPE_NAME_CACHE[t] = sys.intern(typ)
+    return typ
+
+class _ValueRepr(reprlib.Repr):
+    """Bounded formatting of frame locals.
+
+    Containers and strings are cut off while they are formatted instead of
+    being formatted in full and sliced afterwards. Arrays are described by
+    their shape and dtype, never by their data; other objects keep their
+    ``str()``, as before.
+    """
+
+    def repr_Tensor(self, x, level):
+        # formatting the data of a device tensor would copy it to the host
+        return (
+            f"{type(x).__name__}(shape={tuple(x.shape)}, dtype={x.dtype}, "
+            f"device={x.device})"
+        )
+
+    repr_Parameter = repr_Tensor
+
+    def repr_ndarray(self, x, level):
+        return f"ndarray(shape={x.shape}, dtype={x.dtype})"
+
+    def repr_instance(self, x, level):
+        try:
+            shape = getattr(x, "shape", None)
+            if shape and isinstance(shape, tuple) and hasattr(x, "dtype"):
+                # pandas Series, jax and cupy arrays, ...
+                return f"{type(x).__name__}(shape={tuple(shape)}, dtype={x.dtype})"
+            return str(x)[: self.maxother]
+        except Exception:
+            return _get_obj_type(x)
+
+
+_value_repr = _ValueRepr()
+_value_repr.maxstring = 150
+_value_repr.maxother = 150
+_value_repr.maxlong = 150
+_value_repr.maxlist = 5
+_value_repr.maxtuple = 5
+_value_repr.maxset = 5
+_value_repr.maxfrozenset = 5
+_value_repr.maxdeque = 5
+_value_repr.maxdict = 5
+
 
 def _get_obj_repr(obj, value=False):
     typ = _get_obj_type(obj)
     ret = {
         "id": id(obj),
-        "class": _get_obj_type(obj),
+        "class": typ,
     }
     if typ == "torch.Tensor":
+        # shape, dtype and device describe a tensor; formatting its data
+        # would copy it to the host
         ret["shape"] = str(obj.shape)
-        ret["dtype"] = str(obj.dtype)
-        ret["device"] = str(obj.device)
-    if value:
-        ret["value"] = str(obj)[:150]
+        ret["dtype"] = cached_str(obj.dtype)
+        ret["device"] = cached_str(obj.device)
+    elif value:
+        try:
+            if isinstance(obj, str):
+                ret["value"] = obj[:150]  # unquoted, as str() shows it
+            else:
+                ret["value"] = _value_repr.repr(obj)
+        except Exception:
+            ret["value"] = typ
     return ret
 
-class _obj_:
-    def __init__(self, obj):
-        self._obj = obj
-
-    def __repr__(self):
-        return json.dumps(self._obj, indent=2)
-
 @magics_class
 class StackMagic(Magics):
 
     @line_magic
     def bt(self, line: str):
         """Print python and C stack."""
-        py = "".join(traceback.format_stack())
-        return f"{py}"
+        # walk the frame chain directly, skipping the source-line lookups
+        # traceback.format_stack() does for every frame
+        lines = []
+        curr = sys._getframe(1)
+        while curr is not None:
+            code = curr.f_code
+            lines.append(
+                f'  File "{code.co_filename}", line {curr.f_lineno}, in {code.co_name}\n'
+            )
+            curr = curr.f_back
+        lines.reverse()
+        return "".join(lines)
 
     @line_magic
     def dump_stack(self, line: str):
-        """Dump stack frames."""
+        """Dump stack frames.
+
+        Usage:
+            %dump_stack max_frames=None locals=True
+        """
+        args = dict(item.split("=") for item in line.split()) if line else {}
+        max_frames = args.get("max_frames", None)
+        max_frames = int(max_frames) if max_frames is not None else None
+        with_locals = args.get("locals", "True").lower() in ("true", "1", "t")
+
         stacks = []
 
         curr = sys._getframe(1)
         while curr is not None:
+            if max_frames is not None and len(stacks) >= max_frames:
+                break
+            code = curr.f_code
             stack = {
-                "file": curr.f_code.co_filename,
-                "func": curr.f_code.co_name,
+                "file": code.co_filename,
+                "func": code.co_name,
                 "lineno": curr.f_lineno,
-                "locals": {
-                    k: _get_obj_repr(v, value=True) for k, v in curr.f_locals.items()
-                },
             }
+            if with_locals:
+                # f_locals materializes a fresh dict per frame, only pay for it
+                # when the caller asked for locals
+                stack["locals"] = {
+                    k: _get_obj_repr(v, value=True) for k, v in curr.f_locals.items()
+                }
             stacks.append(stack)
             curr = curr.f_back
         return _obj_(stacks)
@@ -1,17 +1,16 @@
 from IPython.core.magic import Magics, magics_class, line_magic
-import gc
 import __main__
-import torch
+
+from . import _registry
 
 @magics_class
 class TorchMagic(Magics):
 
     def __init__(self, shell):
         super().__init__(shell)
-        if not hasattr(__main__, "__probing__"):
-            __main__.__probing__ = {}
-        if "profiler" not in __main__.__probing__:
-            __main__.__probing__["profiler"] = {}
+        state = __main__.__dict__.setdefault("__probing__", {})
+        state.setdefault("profiler", {})
+        self._state = state
 
     @line_magic
     def tprofile(self, line: str):
@@ -33,59 +32,81 @@ class TorchMagic(Magics):
     @line_magic
     def tsummary(self, line: str):
         """Show profiler summary."""
-        if "profiler" in __main__.__probing__:
-            for k, v in __main__.__probing__["profiler"].items():
-                v.summary()
+        for k, v in self._state["profiler"].items():
+            v.summary()
 
     @staticmethod
     def get_top_level_modules() -> list:
-        objs = gc.get_objects()
-        objs = [obj for obj in objs if isinstance(obj, torch.nn.Module)]
-        children = set()
+        return _registry.toplevel_modules()
 
-        def walk(obj):
-            if hasattr(obj, "children"):
-                for child in obj.children():
-                    children.add(id(child))
-                    walk(child)
+    @staticmethod
+    def install_profiler(modules, steps=1):
+        import torch
 
-        for obj in objs:
-            walk(obj)
-        return [obj for obj in objs if id(obj) not in children]
+        from probing.profiling.torch import step
 
-    @staticmethod
-    def install_profiler(module, steps=1):
         class _profiler:
             def __init__(self, steps) -> None:
                 self._steps = steps
                 self._profiler = None
                 self._count = 0
                 self._hooks = []
-                self._module = None
-                self._status = False
-
-            def install(self, module):
-                self._module = module
-                self._profiler = torch.profiler.profile()
-                print(f"installing profiler to module {module}")
-                self._hooks.append(module.register_forward_pre_hook(self.module_hook))
+                self._anchor = None
+                self._last_step = None
+                self._counter_moves = False
+
+            def install(self, modules):
+                # one profiler for all modules: only one profiling session can
+                # be active at a time, and the schedule tracks the step count
+                self._profiler = torch.profiler.profile(
+                    schedule=torch.profiler.schedule(
+                        wait=0, warmup=0, active=self._steps, repeat=1
+                    )
+                )
+                # the profiler records every op in the process, the hooks only
+                # advance its schedule; every top-level module is hooked since
+                # some of them (a loss, a frozen teacher) may never run forward
+                names = ", ".join(type(m).__name__ for m in modules)
+                # class names only: str() of a large model runs to thousands
+                # of lines
+                print(f"installing profiler to modules {names}")
+                for module in modules:
+                    self._hooks.append(
+                        module.register_forward_pre_hook(self.module_hook)
+                    )
                 return self
 
-            def module_hook(self, *args, **kwargs):
-                if self._status is False and self._count < self._steps:
+            def module_hook(self, module, args):
+                curr = step()
+                if self._count == 0:
                     print("==== start profiling ====")
                     self._profiler.start()
-                    self._status = True
+                    # the first module to run forward marks new steps until
+                    # probing's step counter is seen advancing
+                    self._anchor = id(module)
+                    self._last_step = curr
                     self._count += 1
                     return
-                if self._status is True and self._count >= self._steps:
+
+                # one profiler step per training step, however many top-level
+                # modules run forward in it
+                if curr != self._last_step:
+                    self._last_step = curr
+                    self._counter_moves = True
+                elif self._counter_moves or id(module) != self._anchor:
+                    return
+
+                self._profiler.step()
+                if self._count >= self._steps:
                     print("==== stop profiling ====")
-                    self._profiler.step()
                     self._profiler.stop()
-                    self._status = False
-
+                    self.uninstall()
                 self._count += 1
-                self._profiler.step()
+
+            def uninstall(self):
+                for hook in self._hooks:
+                    hook.remove()
+                self._hooks = []
 
             def summary(self):
                 if self._profiler and self._profiler.events():
@@ -93,14 +114,18 @@ class TorchMagic(Magics):
                 else:
                     print("profiler is not started or has no events")
 
-        return _profiler(steps).install(module)
+        if isinstance(modules, torch.nn.Module):
+            modules = [modules]
+        return _profiler(steps).install(modules)
 
     @staticmethod
     def profile(steps=1, mid=None):
         if mid is not None:
-            tms = [m for m in gc.get_objects() if id(m) == mid]
+            m = _registry.module_by_id(mid)
+            tms = [m] if m is not None else []
         else:
             tms = TorchMagic.get_top_level_modules()
-        for m in tms:
-            p = TorchMagic.install_profiler(m, steps)
-            __main__.__probing__["profiler"][id(m)] = p
+        if not tms:
+            return
+        p = TorchMagic.install_profiler(tms, steps)
+        __main__.__probing__["profiler"][tuple(id(m) for m in tms)] = p
@@ -1,9 +1,19 @@
 __ALL__ = ["trace_all_collectives"]
 
-from .coll import CollectiveTracer
+
+def __getattr__(name):
+    # keep `import probing.profiling.collective` free of the torch import
+    if name == "CollectiveTracer":
+        from .coll import CollectiveTracer
+
+        return CollectiveTracer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def trace_all_collectives(trace_file='COLL_TRACE.LOG', verbose=True):
     """Fast API to trace all collective operations in PyTorch."""
+    from .coll import CollectiveTracer
+
     tracer = CollectiveTracer(trace_file=trace_file, verbose=verbose)
     tracer.apply_hooks()
     return tracer
\ No newline at end of file
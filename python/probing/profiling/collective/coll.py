@@ -1,6 +1,12 @@
+import array
+import atexit
+import inspect
+import sys
 import torch
 import torch.distributed as dist
+import threading
 import time
+import weakref
 from functools import wraps
 from typing import List, Optional, Union, Tuple
 
@@ -17,8 +23,39 @@ function_names = [
 
 # 'batch_isend_irecv'
 
-# Store the group ranks for each function in a dictionary
-GROUP_RANKS_CACHE = {}
+function_names = [sys.intern(name) for name in function_names]
+
+TRACE_FILE_BUFFER_SIZE = 1 << 20
+
+# attributes that may carry the tensor of a non-tensor collective argument
+_TENSOR_ATTRS = ('tensor', 'input', 'output', 'data', 'values', 'indices')
+
+# group -> (group_rank, group_size, ranks); weak so destroyed groups drop out
+# instead of leaving a stale entry for a recycled id()
+GROUP_RANKS_CACHE = weakref.WeakKeyDictionary()
+# fallback for groups without weakref support: id(group) -> (group, info)
+_GROUP_RANKS_BY_ID = {}
+# reentrant: the TCPStore fallback issues a (traced) broadcast on the group
+_GROUP_RANKS_LOCK = threading.RLock()
+
+
+def _cached_ranks(group):
+    try:
+        return GROUP_RANKS_CACHE.get(group)
+    except TypeError:
+        entry = _GROUP_RANKS_BY_ID.get(id(group))
+        if entry is not None and entry[0] is group:
+            return entry[1]
+        return None
+
+
+def _cache_ranks(group, info):
+    try:
+        GROUP_RANKS_CACHE[group] = info
+    except TypeError:
+        _GROUP_RANKS_BY_ID[id(group)] = (group, info)
+    return info
+
 
 """
 This function returns a list of participating ranks within a given process group."""
@@ -26,26 +63,39 @@ def get_participating_ranks(group: Optional[dist.ProcessGroup] = None) ->  Tuple
     if not dist.is_initialized():
         return 0, 0, []
 
+    if group is None:
+        group = dist.group.WORLD
+
+    info = _cached_ranks(group)
+    if info is not None:
+        return info
+
+    # only one thread runs the (collective) rank discovery for a group
+    with _GROUP_RANKS_LOCK:
+        info = _cached_ranks(group)
+        if info is not None:
+            return info
+        return _resolve_participating_ranks(group)
+
+
+def _resolve_participating_ranks(group):
     group_rank = dist.get_rank(group=group)
     group_size = dist.get_world_size(group=group)
 
-    if group is None or group == dist.group.WORLD:
-        return group_rank, group_size, list(range(dist.get_world_size()))
+    if group == dist.group.WORLD:
+        return _cache_ranks(
+            group, (group_rank, group_size, list(range(dist.get_world_size())))
+        )
     
     group_id = id(group)
-    
-    if group_id in GROUP_RANKS_CACHE:
-        return group_rank, group_size, GROUP_RANKS_CACHE[group_id]
 
-    
     # Method 1: Use all_gather_object to collect all ranks
     try:
         ranks_list = [None] * group_size
         global_rank = dist.get_rank()
         dist.all_gather_object(ranks_list, global_rank, group=group)
         ranks = [int(r) for r in ranks_list]
-        GROUP_RANKS_CACHE[group_id] = ranks
-        return group_rank, group_size, ranks
+        return _cache_ranks(group, (group_rank, group_size, ranks))
     
     except Exception as e:
         print(f"[Rank {dist.get_rank()}] all_gather_object failed: {e}. Using fallback method.")
@@ -85,14 +135,93 @@ def get_participating_ranks(group: Optional[dist.ProcessGroup] = None) ->  Tuple
         if rank == 0:
             store.delete_key(store_key)
         
-        GROUP_RANKS_CACHE[group_id] = ranks
-        return group_rank, group_size, ranks
+        return _cache_ranks(group, (group_rank, group_size, ranks))
     
     except Exception as e:
         print(f"[Rank {rank}] Failed to get ranks via TCPStore: {e}")
         # If all methods fail, return a list of all ranks in the group
         return group_rank, group_size, [dist.get_rank() for _ in range(group_size)]
 
+class _TraceBuffer:
+    """Trace entries of one thread, stored column-wise.
+
+    Function names and dtypes are kept as small ids into per-buffer tables.
+    Entries timed with CUDA events are appended with a zero duration and
+    kept in ``pending`` until their end event has completed.
+    """
+
+    __slots__ = ('ts', 'dur', 'sz', 'fn_ids', 'dtype_ids', 'shapes', 'fn_table', 'dtype_table',
+                 'pending', 'lock')
+
+    def __init__(self):
+        self.ts = array.array('d')
+        self.dur = array.array('d')
+        self.sz = array.array('q')
+        self.fn_ids = array.array('B')
+        self.dtype_ids = array.array('B')
+        self.shapes = []
+        self.fn_table = {}
+        self.dtype_table = {}
+        # (row, start_event, end_event, func_name, tensor_info, log_context)
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def append(self, func_name, start_time, duration, tensor_info):
+        dtype = _dtype_str(tensor_info['dtype'])
+        self.ts.append(start_time)
+        self.dur.append(duration)
+        self.sz.append(tensor_info['size'])
+        self.fn_ids.append(self.fn_table.setdefault(func_name, len(self.fn_table)))
+        self.dtype_ids.append(self.dtype_table.setdefault(dtype, len(self.dtype_table)))
+        self.shapes.append(tensor_info['shape'])
+
+    def append_pending(self, func_name, start_time, tensor_info, start_event, end_event, context):
+        self.append(func_name, start_time, 0.0, tensor_info)
+        self.pending.append(
+            (len(self.dur) - 1, start_event, end_event, func_name, tensor_info, context)
+        )
+
+    def rows(self):
+        fn_names = list(self.fn_table)
+        dtypes = list(self.dtype_table)
+        return [
+            {
+                'function': fn_names[fn],
+                'timestamp': ts,
+                'duration': dur,
+                'tensor_shape': _plain_shape(shape),
+                'tensor_dtype': dtypes[dt],
+                'tensor_size': sz,
+            }
+            for ts, dur, sz, fn, dt, shape in zip(
+                self.ts, self.dur, self.sz, self.fn_ids, self.dtype_ids, self.shapes
+            )
+        ]
+
+
+class TimedWork:
+    """Async collective handle that records the trace entry on ``wait()``."""
+
+    __slots__ = ('work', 'start_time', 'start_event', 'func_name', 'data_size', 'tensor_info', 'tracer')
+
+    def __init__(self, work, start_time, func_name, data_size, tensor_info=None, Tracer=None, start_event=None):
+        self.work = work
+        self.start_time = start_time
+        self.start_event = start_event
+        self.func_name = func_name
+        self.data_size = data_size
+        self.tensor_info = tensor_info if tensor_info else {'shape': 'unknown', 'dtype': 'unknown', 'size': 0}
+        self.tracer = Tracer
+
+    def wait(self):
+        result = self.work.wait()
+        self.tracer._finish(self.func_name, self.start_time, self.start_event, self.tensor_info)
+        return result
+
+    def is_completed(self):
+        return self.work.is_completed()
+
+
 class CollectiveTracer:
     """
     Trace collective operations for distributed training.
@@ -105,10 +234,16 @@ class CollectiveTracer:
         """
         self.trace_file = trace_file
         self.verbose = verbose
-        self.trace_data = []
+        # one trace buffer per thread, so concurrent collectives never
+        # interleave appends to the same columns
+        self._tls = threading.local()
+        self._buffers = []
+        self._buffers_lock = threading.Lock()
         self.original_functions = {}
         self.hooked_functions = {}
         self.has_cuda = torch.cuda.is_available()
+        # recorded-and-resolved timing events ready for reuse
+        self._event_pool = []
         for func_name in function_names:
             if hasattr(dist, func_name):
                 self.hooked_functions[func_name] = getattr(dist, func_name)
@@ -123,63 +258,67 @@ class CollectiveTracer:
         self.my_size = 1
         self.participate_ranks = []
 
-        self.global_rank = 0
+        self.global_rank = dist.get_rank() if dist.is_initialized() else 0
+        self._global_rank_known = dist.is_initialized()
+
+        # trace file kept open across calls, reopened if the rank changes
+        self._fh = None
+        self._fh_rank = None
+        _TRACERS.add(self)
         
     def _log(self, message):
         """Log a message to console and/or file."""
         if self.verbose:
             print(message)
         if self.trace_file:
-            ranked_filename = f"{self.trace_file}-{self.global_rank}"
-            with open(ranked_filename, 'a') as f:
-                f.write(message + '\n')
+            fh = self._fh
+            if fh is None or self._fh_rank != self.global_rank:
+                fh = self._open_trace_file()
+            fh.write(message)
+            fh.write('\n')
+
+    def _open_trace_file(self):
+        self.close()
+        ranked_filename = f"{self.trace_file}-{self.global_rank}"
+        self._fh = open(ranked_filename, 'a', buffering=TRACE_FILE_BUFFER_SIZE)
+        self._fh_rank = self.global_rank
+        return self._fh
+
+    def _at_exit(self):
+        try:
+            self.resolve_pending()
+        except Exception:
+            pass  # the CUDA context may already be gone
+        self.close()
+
+    def close(self):
+        """Flush and close the trace file."""
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+            self._fh_rank = None
     
-    def create_trace_entry(self, func_name, start_time, duration, tensor_info):
-        """Create a trace entry."""
-        return {
-            'function': func_name,
-            'timestamp': start_time,
-            'duration': duration,
-            'tensor_shape': tensor_info['shape'],
-            'tensor_dtype': str(tensor_info['dtype']),
-            'tensor_size': tensor_info['size']
-        }
+    def append_trace(self, func_name, start_time, duration, tensor_info):
+        """Record a trace entry."""
+        self._buffer().append(func_name, start_time, duration, tensor_info)
+
+    def _buffer(self):
+        buf = getattr(self._tls, 'buf', None)
+        if buf is None:
+            buf = self._new_buffer()
+        return buf
+
+    def _new_buffer(self):
+        buf = self._tls.buf = _TraceBuffer()
+        with self._buffers_lock:
+            self._buffers.append(buf)
+        return buf
     
     def _trace_wrapper(self, func_name, orig_func):
         """Create a wrapper for the original function to trace its execution."""
-        class TimedWork:
-            def __init__(self, work, start_time, func_name, data_size, tensor_info=None, Tracer=None):
-                self.work = work
-                self.start_time = start_time
-                self.func_name = func_name
-                self.data_size = data_size
-                self.tensor_info = tensor_info if tensor_info else {'shape': 'unknown', 'dtype': 'unknown', 'size': 0}
-                self.tracer = Tracer
-                
-            def wait(self):
-                result = self.work.wait()
+        # positions of `group`/`async_op`, resolved once from the signature
+        group_idx, async_idx = _param_positions(orig_func)
 
-                if self.tracer.has_cuda:
-                    _cuda_sync()
-
-                end_time = time.perf_counter()
-                duration = end_time - self.start_time
-                
-                # Create a trace entry
-                trace_entry = self.tracer.create_trace_entry(func_name, self.start_time, duration, self.tensor_info)
-                self.tracer.trace_data.append(trace_entry)
-                
-                # Print trace information
-                self.tracer._log(f"[TRACE] I am {self.tracer.my_rank} && in GROUP_{self.tracer.participate_ranks} - {func_name} - Shape: {self.tensor_info['shape']}, "
-                        f"Dtype: {self.tensor_info['dtype']}, Size: {self.tensor_info['size']/1024/1024:.2f} MB, "
-                        f"Duration: {duration*1e3:.3f} ms, "
-                        f"size of coll is {self.tracer.my_size}  where the global rank is {self.tracer.global_rank}")
-  
-                return result
-            
-            def is_completed(self):
-                return self.work.is_completed()
-            
         @wraps(orig_func)
         def wrapper(*args, **kwargs):
             # ------------ Collective Counts +1 ------------
@@ -188,44 +327,97 @@ class CollectiveTracer:
 
             tensor_info = self._extract_tensor_info(args, kwargs)
 
-            if self.has_cuda:
-                _cuda_sync()
             start_time = time.perf_counter()
-            tensor = args[0] if args else None
-            print(f"tensor.numel={tensor.numel()}   tensor.element_size={tensor.element_size()}\n")
-            data_size = tensor.numel() * tensor.element_size() if tensor is not None else 0
+            # CUDA events only time work queued on the current stream (NCCL);
+            # gloo and CPU tensors are timed on the host
+            start_event = self._record_event() if tensor_info.get('is_cuda') else None
+            # nbytes of the tensor found by _extract_tensor_info, no extra C calls
+            data_size = tensor_info['size']
 
-            group = kwargs.get('group') or (args[2] if len(args) > 2 else None)
-            self.my_rank, self.my_size, self.participate_ranks = get_participating_ranks(group)
-
-            self.global_rank = dist.get_rank()
+            group = kwargs.get('group')
+            if group is None and len(args) > group_idx:
+                group = args[group_idx]
+            self.my_rank, self.my_size, self.participate_ranks = self._group_ranks(group)
             
             is_async = kwargs.get('async_op', False)
+            if not is_async and len(args) > async_idx:
+                is_async = args[async_idx]
             if is_async:
                 work = orig_func(*args, **kwargs)
 
-                return TimedWork(work, start_time, func_name, data_size, tensor_info, self)
+                return TimedWork(work, start_time, func_name, data_size, tensor_info, self, start_event)
             else:
                 work = orig_func(*args, **kwargs)
-                
-                if self.has_cuda:
-                    _cuda_sync()
-
-                end_time = time.perf_counter()
-                duration = end_time - start_time
-                
-                trace_entry = self.create_trace_entry(func_name, start_time, duration, tensor_info)
-                self.trace_data.append(trace_entry)
-                
-                # Print trace information
-                self._log(f"[TRACE] I am {self.my_rank} && in GROUP_{self.participate_ranks} - {func_name} - Shape: {tensor_info['shape']}, "
-                        f"Dtype: {tensor_info['dtype']}, Size: {tensor_info['size']/1024/1024:.2f} MB, "
-                        f"Duration: {duration*1e3:.3f} ms, "
-                        f"size of coll is {self.my_size}  where the global rank is {self.global_rank}")
+                self._finish(func_name, start_time, start_event, tensor_info)
                 return work
         
         return wrapper
     
+    def _record_event(self):
+        """Record a timing event on the current stream, or None without CUDA."""
+        if not self.has_cuda:
+            return None
+        try:
+            ev = self._event_pool.pop()
+        except IndexError:
+            ev = torch.cuda.Event(enable_timing=True)
+        ev.record()
+        return ev
+
+    def _finish(self, func_name, start_time, start_event, tensor_info):
+        """Record and log a finished collective.
+
+        For CUDA tensors the end event is only recorded here; the entry's
+        duration and log line are filled in by ``_resolve`` once the device
+        has passed the event, so the host never waits on the collective.
+        """
+        context = (self.my_rank, self.participate_ranks, self.my_size, self.global_rank)
+        buf = self._buffer()
+        if start_event is None:
+            duration = time.perf_counter() - start_time
+            buf.append(func_name, start_time, duration, tensor_info)
+            self._log(_trace_message(func_name, tensor_info, duration, *context))
+            return
+        buf.append_pending(
+            func_name, start_time, tensor_info, start_event, self._record_event(), context
+        )
+        self._resolve(buf, block=False)
+
+    def _resolve(self, buf, block):
+        """Fill in the durations of ``buf``'s pending entries.
+
+        Entries are resolved in order and, unless ``block`` is set, only as
+        far as the first end event the device has not reached yet.
+        """
+        with buf.lock:
+            pending = buf.pending
+            done = 0
+            for row, start, end, func_name, tensor_info, context in pending:
+                if block:
+                    end.synchronize()
+                elif not end.query():
+                    break
+                duration = start.elapsed_time(end) * 1e-3
+                buf.dur[row] = duration
+                self._event_pool += (start, end)
+                self._log(_trace_message(func_name, tensor_info, duration, *context))
+                done += 1
+            del pending[:done]
+
+    def resolve_pending(self):
+        """Wait for and fill in all outstanding event timings."""
+        with self._buffers_lock:
+            buffers = list(self._buffers)
+        for buf in buffers:
+            self._resolve(buf, block=True)
+
+    def _group_ranks(self, group):
+        """Rank info for ``group``; the global rank is read once after dist init."""
+        if not self._global_rank_known and dist.is_initialized():
+            self.global_rank = dist.get_rank()
+            self._global_rank_known = True
+        return get_participating_ranks(group)
+
     def _extract_tensor_info(self, args, kwargs):
         """sub function to extract tensor information from arguments."""
         tensor = None
@@ -246,22 +438,20 @@ class CollectiveTracer:
         # If still not found, check if the first argument is an object with a tensor attribute
         if tensor is None and args:
             first_arg = args[0]
-            for attr in dir(first_arg):
-                try:
-                    value = getattr(first_arg, attr)
-                    if isinstance(value, torch.Tensor):
-                        tensor = value
-                        break
-                except:
-                    continue
+            for attr in _TENSOR_ATTRS:
+                value = getattr(first_arg, attr, None)
+                if isinstance(value, torch.Tensor):
+                    tensor = value
+                    break
         
         if tensor is None:
             return {'shape': 'unknown', 'dtype': 'unknown', 'size': 0}
             
         return {
-            'shape': tuple(tensor.shape),
+            'shape': tensor.shape,
             'dtype': tensor.dtype,
-            'size': tensor.element_size() * tensor.numel()
+            'size': _nbytes(tensor),
+            'is_cuda': tensor.is_cuda,
         }
      
     
@@ -277,27 +467,90 @@ class CollectiveTracer:
             if hasattr(dist, func_name):
                 setattr(dist, func_name, orig_func)
                 self._log(f"Removed hook from function: {func_name}")
+        self.resolve_pending()
+        self.close()
     
     def get_trace_data(self):
-        return self.trace_data
+        self.resolve_pending()
+        with self._buffers_lock:
+            buffers = list(self._buffers)
+        rows = [row for buf in buffers for row in buf.rows()]
+        if len(buffers) > 1:
+            rows.sort(key=lambda row: row['timestamp'])
+        return rows
     
     def get_all_call_counts(self):
         return self.call_counts.copy()
     
     def export_to_csv(self, filename):
         import csv
-        if not self.trace_data:
+        trace_data = self.get_trace_data()
+        if not trace_data:
             self._log("No trace data to export.")
             return
             
         with open(filename, 'w', newline='') as csvfile:
-            fieldnames = self.trace_data[0].keys()
+            fieldnames = trace_data[0].keys()
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             writer.writeheader()
-            for row in self.trace_data:
+            for row in trace_data:
                 writer.writerow(row)
                 
         self._log(f"Exported trace data to {filename}")
 
-def _cuda_sync():
-    torch.cuda.synchronize()
\ No newline at end of file
+# live tracers; one exit hook resolves them all without keeping any alive
+_TRACERS = weakref.WeakSet()
+
+
+def _resolve_at_exit():
+    for tracer in list(_TRACERS):
+        tracer._at_exit()
+
+
+atexit.register(_resolve_at_exit)
+
+
+def _trace_message(func_name, tensor_info, duration, my_rank, participate_ranks, my_size, global_rank):
+    return (f"[TRACE] I am {my_rank} && in GROUP_{participate_ranks} - {func_name} - Shape: {_plain_shape(tensor_info['shape'])}, "
+            f"Dtype: {tensor_info['dtype']}, Size: {tensor_info['size']/1024/1024:.2f} MB, "
+            f"Duration: {duration*1e3:.3f} ms, "
+            f"size of coll is {my_size}  where the global rank is {global_rank}")
+
+
+# Tensor.nbytes is a single C call; older torch releases lack it
+if hasattr(torch.Tensor, 'nbytes'):
+    def _nbytes(tensor):
+        return tensor.nbytes
+else:
+    def _nbytes(tensor):
+        return tensor.numel() * tensor.element_size()
+
+
+def _plain_shape(shape):
+    # the hot path keeps the tensor's torch.Size; traces show a plain tuple
+    return tuple(shape) if isinstance(shape, torch.Size) else shape
+
+
+_DTYPE_STR_CACHE = {}
+
+
+def _dtype_str(dtype):
+    s = _DTYPE_STR_CACHE.get(dtype)
+    if s is None:
+        s = _DTYPE_STR_CACHE[dtype] = sys.intern(str(dtype))
+    return s
+
+
+def _param_positions(func):
+    """Positional indices of the ``group`` and ``async_op`` parameters of ``func``.
+
+    A parameter the function does not take gets ``sys.maxsize`` so that the
+    ``len(args) > idx`` check in the wrapper never matches it.
+    """
+    try:
+        params = list(inspect.signature(func).parameters)
+    except (TypeError, ValueError):
+        return 2, 3
+    group_idx = params.index('group') if 'group' in params else sys.maxsize
+    async_idx = params.index('async_op') if 'async_op' in params else sys.maxsize
+    return group_idx, async_idx
@@ -1,17 +1,31 @@
+import weakref
+
 import torch
 
 from ..types import TensorDef
 
-NAME_CACHE = {}
+# module -> cached value; weak, so entries go away with their module, and kept
+# off the module so that deepcopies and pickles do not inherit them
+NAME_CACHE = weakref.WeakKeyDictionary()
+_MISSING = object()
+
+
+def _set_cached(cache, m, value):
+    try:
+        cache[m] = value
+    except TypeError:
+        pass  # not weakly referenceable
 
 
 def module_name(m, name=None):
-    global NAME_CACHE
-    mid = id(m)
-    if mid in NAME_CACHE:
-        return NAME_CACHE[mid]
+    try:
+        cached = NAME_CACHE.get(m)
+    except TypeError:
+        cached = None
+    if cached is not None:
+        return cached
     elif name is not None:
-        NAME_CACHE[mid] = name
+        _set_cached(NAME_CACHE, m, name)
         return name
     return None
 
@@ -46,18 +60,20 @@ def module_analysis(m, prefix=""):
 
 
 def _cache(func):
-    cache = {}
+    cache = weakref.WeakKeyDictionary()
 
     def wrapper(m, value=None):
-        nonlocal cache
-        mid = id(m)
         if value is not None:
-            cache[mid] = value
-        elif mid not in cache:
-            cache[mid] = func(m)
-            return cache[mid]
-        else:
-            return cache[mid]
+            _set_cached(cache, m, value)
+            return None
+        try:
+            value = cache.get(m, _MISSING)
+        except TypeError:
+            value = _MISSING
+        if value is _MISSING:
+            value = func(m)
+            _set_cached(cache, m, value)
+        return value
 
     return wrapper
 
@@ -82,9 +98,14 @@ def get_toplevel_module():
 
     import torch
 
-    objs = [obj for obj in gc.get_objects() if isinstance(obj, torch.nn.Module)]
+    module_type = torch.nn.Module
+    objs = [obj for obj in gc.get_objects() if isinstance(obj, module_type)]
+    # every module is in objs, so marking direct children once per module is
+    # enough; _modules avoids the generator and memo set of children()
     is_child = set()
+    add = is_child.add
     for obj in objs:
-        for child in obj.children():
-            is_child.add(id(child))
+        for child in obj._modules.values():
+            if child is not None:
+                add(id(child))
     return [obj for obj in objs if id(obj) not in is_child]
@@ -1,32 +1,32 @@
-LAYER_ITER = 0
-OPTIM_ITER = 1
+import array
+
+# shared counters, updated in place instead of rebinding module globals
+_COUNTERS = array.array("q", [0, 1])
+LAYER = 0
+OPTIM = 1
 
 
 def reset_layer(cnt=None):
-    global LAYER_ITER
     cnt = 0 if cnt is None else cnt
-    LAYER_ITER = cnt
+    _COUNTERS[LAYER] = cnt
 
 
 def next_layer():
-    global LAYER_ITER
-    LAYER_ITER += 1
+    _COUNTERS[LAYER] += 1
 
 
 def reset_step(cnt=None):
-    global OPTIM_ITER
     cnt = 0 if cnt is None else cnt
-    OPTIM_ITER = cnt
+    _COUNTERS[OPTIM] = cnt
 
 
 def next_step():
-    global OPTIM_ITER
-    OPTIM_ITER += 1
+    _COUNTERS[OPTIM] += 1
 
 
 def step():
-    return OPTIM_ITER
+    return _COUNTERS[OPTIM]
 
 
 def layer():
-    return LAYER_ITER
+    return _COUNTERS[LAYER]
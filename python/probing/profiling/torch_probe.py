@@ -1,16 +1,26 @@
-import random
+import atexit
+import queue
+import sys
+import threading
 import time
+import weakref
+from array import array
 from dataclasses import dataclass
+from itertools import cycle, islice
+from random import random as _random
 from typing import Optional
 
 from probing.core import table
 
 from .torch.module_utils import module_name
-from .types import BaseTracer
+from .types import STAGE_NAMES, BaseTracer
+
+# dataclass(slots=True) needs Python 3.10; older interpreters get plain rows
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
 
 @table
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class TorchTrace:
     step: Optional[int] = None
     seq: Optional[int] = None
@@ -22,11 +32,10 @@ class TorchTrace:
     max_cached: float = 0.0
     time_offset: float = 0.0
     duration: float = 0.0
-    duration: float = 0.0
 
 
 @table
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class Variables:
     step: Optional[int] = None
     func: Optional[str] = None
@@ -34,93 +43,339 @@ class Variables:
     value: Optional[str] = None
 
 
-class DelayedRecord:
-    def __init__(self, record, events):
-        self.record = record
-        self.events = events
+MB = 1024 * 1024
 
-    def save(self):
-        try:
-            if self.events is not None:
-                start, end = self.events
-                self.record.duration = start.elapsed_time(end) / 1000.0
-            self.record.save()
-        except Exception as e:
-            print(f"Error saving trace: {e}")
+# torch entry points used by the hooks, bound once by _bind_torch() so that
+# no hook has to go through the import machinery on every call
+_torch = None
+_memory_stats = None
+_synchronize = None
+_Event = None
+_Optimizer = None
 
 
-def mem_stats() -> TorchTrace:
-    import torch
+def _bind_torch():
+    global _torch, _memory_stats, _synchronize, _Event, _Optimizer
+
+    if _torch is None:
+        import torch
+
+        _memory_stats = torch.cuda.memory_stats
+        _synchronize = torch.cuda.synchronize
+        _Event = torch.cuda.Event
+        _Optimizer = torch.optim.Optimizer
+        _torch = torch
+    return _torch
+
 
-    MB = 1024 * 1024
+def _mem_values() -> tuple:
+    """Return allocated, max_allocated, cached and max_cached in MB.
+
+    ``torch.cuda.memory_allocated()`` and friends each build the whole
+    allocator stats dict to read one counter, so the dict is built once here
+    and all four counters are read from it.
+    """
+    if _torch is None:
+        _bind_torch()
+
+    get = _memory_stats().get
+    return (
+        get("allocated_bytes.all.current", 0) / MB,
+        get("allocated_bytes.all.peak", 0) / MB,
+        get("reserved_bytes.all.current", 0) / MB,
+        get("reserved_bytes.all.peak", 0) / MB,
+    )
+
+
+# type -> whether it is a torch optimizer, filled on first sight of a type
+_OPTIMIZER_TYPES = {}
+
+
+def _is_optimizer(cls) -> bool:
+    is_opt = _OPTIMIZER_TYPES.get(cls)
+    if is_opt is None:
+        if _torch is None:
+            _bind_torch()
+        is_opt = _OPTIMIZER_TYPES[cls] = issubclass(cls, _Optimizer)
+    return is_opt
+
+
+def mem_stats() -> TorchTrace:
+    allocated, max_allocated, cached, max_cached = _mem_values()
     return TorchTrace(
-        allocated=torch.cuda.memory_allocated() / MB,
-        cached=torch.cuda.memory_reserved() / MB,
-        max_allocated=torch.cuda.max_memory_allocated() / MB,
-        max_cached=torch.cuda.max_memory_reserved() / MB,
+        allocated=allocated,
+        cached=cached,
+        max_allocated=max_allocated,
+        max_cached=max_cached,
+    )
+
+
+class TraceBatch:
+    """The TorchTrace rows of one step, stored column by column.
+
+    Hooks append plain values to typed arrays instead of building a
+    ``TorchTrace`` per call. ``flush`` resolves the CUDA event timings once
+    the step is over and hands the columns to the trace writer thread.
+    """
+
+    __slots__ = (
+        "step",
+        "seq",
+        "module",
+        "stage",
+        "allocated",
+        "max_allocated",
+        "cached",
+        "max_cached",
+        "time_offset",
+        "events",
+        "offset_events",
     )
 
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.step = array("q")
+        self.seq = array("q")
+        self.module = []
+        self.stage = array("b")
+        self.allocated = array("d")
+        self.max_allocated = array("d")
+        self.cached = array("d")
+        self.max_cached = array("d")
+        self.time_offset = array("d")
+        self.events = []
+        self.offset_events = []
+
+    def __len__(self):
+        return len(self.step)
+
+    def append(self, step, seq, module, stage, mem, time_offset, events, offset_events):
+        self.step.append(step)
+        self.seq.append(seq)
+        self.module.append(module)
+        self.stage.append(stage)
+        self.allocated.append(mem[0])
+        self.max_allocated.append(mem[1])
+        self.cached.append(mem[2])
+        self.max_cached.append(mem[3])
+        self.time_offset.append(time_offset)
+        self.events.append(events)
+        self.offset_events.append(offset_events)
+
+    def flush(self):
+        """Resolve event timings, queue the rows for ``TorchTrace`` and reset."""
+        if not self.step:
+            return
+
+        time_offset = self.time_offset
+        duration = array("d", bytes(8 * len(time_offset)))
+        failed = []
+        error = None
+        for i, (events, offset_events) in enumerate(
+            zip(self.events, self.offset_events)
+        ):
+            try:
+                if offset_events is not None:
+                    step_start, here = offset_events
+                    time_offset[i] = step_start.elapsed_time(here) / 1000.0
+                if events is not None:
+                    start, end = events
+                    duration[i] = start.elapsed_time(end) / 1000.0
+            except Exception as e:
+                error = e
+                failed.append(i)
+
+        columns = [
+            self.step,
+            self.seq,
+            self.module,
+            [STAGE_NAMES[stage] for stage in self.stage],
+            self.allocated,
+            self.max_allocated,
+            self.cached,
+            self.max_cached,
+            time_offset,
+            duration,
+        ]
+        if failed:
+            # one report per step, not one stdout write per failed record
+            print(f"Error saving trace: {error} ({len(failed)} records dropped)")
+            failed = set(failed)
+            keep = [i for i in range(len(duration)) if i not in failed]
+            columns = [[col[i] for i in keep] for col in columns]
+        # the writer owns the queued columns, so start over with fresh arrays
+        # instead of clearing the ones just handed off
+        _trace_writer().put(columns)
+        self.reset()
+
+
+class _TraceWriter:
+    """Daemon thread that writes queued ``TorchTrace`` columns to the table.
+
+    Converting the rows and inserting them into the table happens here,
+    off the training thread. Batches are written in the order they were
+    queued; ``close`` drains the queue before the interpreter exits.
+    """
+
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(
+            target=self.run, name="probing-trace-writer", daemon=True
+        )
+        self.thread.start()
+        atexit.register(self.close)
 
-STAGEMAP = {
-    "pre forward": "forward",
-    "post forward": "forward",
-    "pre backward": "backward",
-    "post backward": "backward",
-    "pre step": "step",
-    "post step": "step",
-}
+    def put(self, columns):
+        self.queue.put(columns)
+
+    def run(self):
+        get = self.queue.get
+        while True:
+            columns = get()
+            if columns is None:
+                return
+            try:
+                TorchTrace.append_columns(columns)
+            except Exception as e:
+                print(f"Error saving trace: {e}")
+
+    def close(self, timeout=5.0):
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+
+_WRITER = None
+_WRITER_LOCK = threading.Lock()
+
+
+def _trace_writer():
+    global _WRITER
+    if _WRITER is None:
+        with _WRITER_LOCK:
+            if _WRITER is None:
+                _WRITER = _TraceWriter()
+    return _WRITER
+
+
+# slot of each stage in a module's [forward, backward, step] event row
+_STAGE_GROUP = (0, 0, 1, 1, 2, 2)
+NUM_STAGE_GROUPS = 3
 
 
 class Timer:
+    """Times module stages.
+
+    With CUDA, both the offset from the step start and the stage duration are
+    measured with CUDA events, so the hooks never block on the device; the
+    event pairs are resolved after the step in ``post_step_hook``. Without
+    CUDA, the offset falls back to the host monotonic clock. ``sync`` is kept for
+    compatibility; event timing does not need a device synchronize.
+    """
+
     def __init__(self, sync: bool = False, **kwargs):
-        import torch
+        torch = _bind_torch()
 
         self.has_cuda = torch.cuda.is_available()
         self.sync = sync
-        self.events = {}  # GPU timers
+        self.events = {}  # GPU timers of modules without a slot
+        self.event_slots = []  # [forward, backward, step] events by mod_index
         self.step_start = None
+        self.step_start_event = None
+        self._event_pool = []  # recorded-and-resolved events ready for reuse
+        self._step_events = []  # events handed out during the current step
+
+        # pick the timing path once, so the hooks do not test has_cuda
+        if self.has_cuda:
+            self.begin_timing = self._begin_timing_cuda
+            self.end_timing = self._end_timing_cuda
+        else:
+            self.begin_timing = self._begin_timing_host
+            self.end_timing = self._end_timing_host
 
         super().__init__(**kwargs)
 
-    def begin_timing(self, mod, stage) -> float:
-        # Synchronize if needed for more accurate timing
-        if self.sync and self.has_cuda:
-            _cuda_sync()
+    def _begin_timing_host(self, mod, stage) -> tuple:
+        if self.offset() == 0:
+            self.step_start = time.monotonic_ns()
+        return (time.monotonic_ns() - self.step_start) * 1e-9, None
 
+    def _end_timing_host(self, mod, stage) -> tuple:
+        return (time.monotonic_ns() - self.step_start) * 1e-9, None, None
+
+    def _begin_timing_cuda(self, mod, stage) -> tuple:
         if self.offset() == 0:
-            self.step_start = time.time()
-            time_offset = 0.0
+            self.step_start = time.monotonic_ns()
+            self.step_start_event = self._acquire_event()
+
+        event = self._acquire_event()
+        idx = self.mod_index.get(id(mod), -1)
+        if 0 <= idx < len(self.event_slots):
+            self.event_slots[idx][_STAGE_GROUP[stage]] = event
         else:
-            time_offset = time.time() - self.step_start
+            self.events[(id(mod), _STAGE_GROUP[stage])] = event
+        return 0.0, self._offset_events(event)
+
+    def _end_timing_cuda(self, mod, stage) -> tuple:
+        end = self._acquire_event()
+        idx = self.mod_index.get(id(mod), -1)
+        if 0 <= idx < len(self.event_slots):
+            slots = self.event_slots[idx]
+            stage_idx = _STAGE_GROUP[stage]
+            start = slots[stage_idx]
+            slots[stage_idx] = None
+        else:
+            start = self.events.pop((id(mod), _STAGE_GROUP[stage]), None)
 
-        if self.has_cuda:
-            key = (id(mod), STAGEMAP[stage])
-            self.events[key] = _cuda_event()
-        return time_offset
+        if start is not None:
+            return 0.0, (start, end), self._offset_events(end)
+        return 0.0, None, self._offset_events(end)
 
-    def end_timing(self, mod, stage) -> tuple:
-        # Synchronize if needed for more accurate timing
-        if self.sync and self.has_cuda:
-            _cuda_sync()
+    def init_event_slots(self, num_mods):
+        self.event_slots = [[None] * NUM_STAGE_GROUPS for _ in range(num_mods)]
 
-        time_offset = time.time() - self.step_start
-        key = (id(mod), STAGEMAP[stage])
+    def _acquire_event(self):
+        pool = self._event_pool
+        event = pool.pop() if pool else _new_cuda_event()
+        event.record()
+        self._step_events.append(event)
+        return event
 
-        if key in self.events:
-            return time_offset, (self.events.pop(key), _cuda_event())
-        return time_offset, None
+    def release_events(self):
+        """Return this step's events to the pool once their timings are read."""
+        self._event_pool.extend(self._step_events)
+        self._step_events.clear()
+        self.events.clear()
+        for slots in self.event_slots:
+            slots[:] = (None,) * NUM_STAGE_GROUPS
+
+    def _offset_events(self, event):
+        if self.step_start_event is None:
+            return None
+        return (self.step_start_event, event)
 
 
 class Sampler:
-    def __init__(self, mode="ordered", rate=1.0, **kwargs):
+    def __init__(self, mode="ordered", rate=1.0, max_mods=0, **kwargs):
         # Strategy configuration
         self.mode = mode
         self.rate = rate
+        # track at most max_mods modules, reservoir-sampled during discovery;
+        # 0 tracks every module
+        self.max_mods = max_mods
 
         # Module tracking state
-        self.mod_names = {}  # Maps module IDs to names
+        self.mod_names = {}  # Maps module IDs to names, live modules only
         self.mod_queue = []  # List of module IDs to track
-        self.curr_idx = 0
+        # id(module) -> its row in Timer.event_slots, live modules only; kept
+        # off the module so that a deepcopy does not share the original's row
+        self.mod_index = {}
+        self.num_mods = 0  # modules registered so far, the next row
+        self.num_seen = 0  # distinct modules seen during discovery
+        self.mod_slots = []  # reservoir of tracked module IDs, with max_mods
+        self.mod_rejected = set()  # IDs left out of the reservoir
+        self.mod_cycle = None  # endless iterator over mod_queue
         self.curr_mod = None
 
         # Discovery state
@@ -129,46 +384,99 @@ class Sampler:
 
         super().__init__(**kwargs)
 
-    def register_mod(self, mod) -> None:
+    def register_mod(self, mod, mid=None) -> None:
         if self.finalized:
             return
 
-        import torch
+        if mid is None:
+            mid = id(mod)
+        if mid in self.mod_names or mid in self.mod_rejected:
+            return
 
-        self.mod_names[id(mod)] = module_name(mod) or (
-            mod.__class__.__name__ if isinstance(mod, torch.optim.Optimizer) else "None"
-        )
+        self.num_seen += 1
+        max_mods = self.max_mods
+        if max_mods:
+            if len(self.mod_slots) < max_mods:
+                self.mod_slots.append(mid)
+            else:
+                # keep the n-th module with probability max_mods / n, in
+                # place of a random tracked one
+                j = int(_random() * self.num_seen)
+                if j >= max_mods:
+                    self.mod_rejected.add(mid)
+                    return
+                evicted = self.mod_slots[j]
+                self.mod_names.pop(evicted, None)
+                self.mod_index.pop(evicted, None)
+                self.mod_rejected.add(evicted)
+                self.mod_slots[j] = mid
+
+        name = module_name(mod)
+        if not name:
+            name = mod.__class__.__name__ if _is_optimizer(type(mod)) else "None"
+
+        # registration order indexes the module's row in Timer.event_slots
+        self.mod_index[mid] = self.num_mods
+        self.num_mods += 1
+        self.mod_names[mid] = name
+
+        # forget the id once the module is collected, so that an object
+        # allocated at the same address is not taken for this module
+        try:
+            weakref.finalize(mod, self._forget_mod, mid).atexit = False
+        except TypeError:
+            pass
+
+    def _forget_mod(self, mid):
+        self.mod_names.pop(mid, None)
+        self.mod_index.pop(mid, None)
 
     def finalize_discovery(self):
         self.finalized = True
-        mods = sorted(self.mod_names.items(), key=lambda x: len(x[1]))
-        self.mod_queue = [x for x, _ in mods]
+        self.mod_slots = []
+        self.mod_rejected = set()
+        # bucket the modules by name length; registration order is kept
+        # within a bucket, which matches a stable sort on len(name)
+        buckets = {}
+        for mod_id, name in self.mod_names.items():
+            buckets.setdefault(len(name), []).append(mod_id)
+        self.mod_queue = [
+            mod_id for size in sorted(buckets) for mod_id in buckets[size]
+        ]
 
         if self.mod_queue:
-            self.curr_idx = 0
-            self.curr_mod = self.mod_queue[0]
+            self.mod_cycle = cycle(self.mod_queue)
+            self.curr_mod = next(self.mod_cycle)
 
-    def should_sample(self, mod) -> bool:
+    def should_sample(self, mod, mid=None) -> bool:
         if not self.finalized:
-            self.register_mod(mod)
+            self.register_mod(mod, mid)
             return False
 
         if not self.sampled_step:
             return False
 
+        if self.mode == "ordered":
+            # the common case: one id comparison decides most hooks
+            if (id(mod) if mid is None else mid) == self.curr_mod:
+                return True
+            return self.offset() == 0
         if self.offset() == 0:
             return True
-
-        if self.mode == "ordered":
-            return id(mod) == self.curr_mod
-        return random.random() < self.rate
+        if self.max_mods and (id(mod) if mid is None else mid) not in self.mod_names:
+            # left out of the reservoir during discovery
+            return False
+        return _random() < self.rate
 
     def next_mod(self) -> None:
         if self.mod_queue and self.mode == "ordered":
-            self.sampled_step = random.random() < self.rate
-            idx = (self.curr_idx + 1) % len(self.mod_queue)
-            self.curr_idx = idx
-            self.curr_mod = self.mod_queue[idx]
+            self.sampled_step = _random() < self.rate
+            alive = self.mod_names
+            # skip modules that have been collected since discovery
+            for mid in islice(self.mod_cycle, len(self.mod_queue)):
+                if mid in alive:
+                    break
+            self.curr_mod = mid
 
     def set_sampling_mode(self, expr):
         """Set the sampling mode and rate based on the provided expression.
@@ -212,16 +520,59 @@ class Sampler:
 
 class PythonTracer:
     def __init__(self, tracepy=False, **kwargs):
+        self._monitoring_tool = None
         # Set up Python exception tracing if requested
         if tracepy:
-            import sys
-
-            sys.settrace(self.trace_exceptions)
+            self.install_exception_tracer()
         super().__init__(**kwargs)
 
+    def install_exception_tracer(self):
+        """Report RuntimeErrors raised in Python code.
+
+        ``sys.monitoring`` (Python 3.12+) calls back on raises only, in every
+        thread of the process. It takes a tool id that no debugger, coverage
+        tool or profiler uses by convention, and falls back if none is free.
+        The fallback, and older interpreters, use ``sys.settrace`` with line
+        events turned off per frame; that only covers the calling thread, and
+        runs on calls and exceptions but not on every executed line.
+        """
+        monitoring = getattr(sys, "monitoring", None)
+        if monitoring is not None:
+            for tool in (3, 4, monitoring.OPTIMIZER_ID):
+                if monitoring.get_tool(tool) is not None:
+                    continue
+                try:
+                    monitoring.use_tool_id(tool, "probing")
+                except ValueError:
+                    continue  # claimed in the meantime
+                raise_event = monitoring.events.RAISE
+                monitoring.register_callback(tool, raise_event, self.on_raise)
+                monitoring.set_events(tool, raise_event)
+                self._monitoring_tool = tool
+                return
+        sys.settrace(self.trace_exceptions)
+
+    def uninstall_exception_tracer(self):
+        """Undo ``install_exception_tracer``."""
+        tool = self._monitoring_tool
+        if tool is not None:
+            monitoring = sys.monitoring
+            monitoring.set_events(tool, 0)
+            monitoring.register_callback(tool, monitoring.events.RAISE, None)
+            monitoring.free_tool_id(tool)
+            self._monitoring_tool = None
+        elif sys.gettrace() == self.trace_exceptions:
+            sys.settrace(None)
+
+    def on_raise(self, code, offset, value):
+        if isinstance(value, RuntimeError):
+            print(f"Exception: {type(value)}, Value: {value}")
+
     def trace_exceptions(self, frame, event, arg):
         """Trace Python exceptions during execution."""
-        if event == "exception":
+        if event == "call":
+            frame.f_trace_lines = False
+        elif event == "exception":
             exception, value, traceback = arg
             if isinstance(value, RuntimeError):
                 print(f"Exception: {exception}, Value: {value}")
@@ -276,12 +627,13 @@ class VariableTracer:
                 if fun not in self.variabls:
                     self.variabls[fun] = []
                 self.variabls[fun].append(var)
+        self._func_set = frozenset(self.variabls)
 
     def trace_variables(self):
         """
         Traces variables specified during initialization in the current execution stack.
 
-        This method inspects the call stack, looking for functions specified during
+        This method walks the call stack, looking for functions specified during
         initialization. When found, it retrieves the values of the specified variables
         and saves them using the Variables dataclass.
 
@@ -291,92 +643,135 @@ class VariableTracer:
         if not self.variabls:
             return
 
-        import inspect
-
-        stacks = inspect.stack()[1:]
-        for stack in stacks:
-            frame = stack.frame
-            code = frame.f_code
-            func = code.co_name
-            if func in self.variabls:
+        funcs = self._func_set
+        frame = sys._getframe(1)
+        while frame is not None:
+            func = frame.f_code.co_name
+            if func in funcs:
+                f_locals = frame.f_locals
                 for var in self.variabls[func]:
-                    if var in frame.f_locals:
-                        val = frame.f_locals[var]
-                        try:
-                            val = str(val)
-                        except Exception as e:
-                            val = f"{type(val)}"
+                    if var in f_locals:
+                        val = _summarize(f_locals[var])
                         Variables(self.curr_step, func, var, val).save()
+            frame = frame.f_back
+
+
+def _summarize(val) -> str:
+    """Describe a traced value without formatting tensor data.
+
+    ``str()`` of a CUDA tensor copies it to the host and blocks on the
+    device, so tensors are reduced to their shape, dtype and device.
+    """
+    if _torch is not None and isinstance(val, _torch.Tensor):
+        return f"Tensor(shape={tuple(val.shape)}, dtype={val.dtype}, device={val.device})"
+    try:
+        return str(val)
+    except Exception:
+        return f"{type(val)}"
 
 
 class TorchProbe(BaseTracer, Timer, Sampler, PythonTracer, VariableTracer):
-    def __init__(self, tracepy=False, sync=False, mode="ordered", rate=1.0, exprs=""):
+    def __init__(
+        self,
+        tracepy=False,
+        sync=False,
+        mode="ordered",
+        rate=1.0,
+        exprs="",
+        mem_every=1,
+        max_mods=0,
+    ):
         self.curr_step = 0
-        self.pending = []
-
-        super().__init__(tracepy=tracepy, sync=sync, mode=mode, rate=rate, exprs=exprs)
+        self.batch = TraceBatch()
+        # Query the allocator stats on every ``mem_every``-th logged hook of a
+        # step only and repeat the last values in between; fewer allocator
+        # calls at the cost of coarser memory columns. The count restarts
+        # every step, so each step's first record has fresh stats.
+        self.mem_every = max(1, int(mem_every))
+        self._last_mem = (0.0, 0.0, 0.0, 0.0)
+        self._num_logged = 0  # records logged in the current step
+        _PROBES.add(self)
+
+        super().__init__(
+            tracepy=tracepy,
+            sync=sync,
+            mode=mode,
+            rate=rate,
+            exprs=exprs,
+            max_mods=max_mods,
+        )
 
     def log_module_stage(self, stage, mod, force=False) -> None:
+        mid = id(mod)
         # Skip if we shouldn't log this module
-        if not force and not self.should_sample(mod):
+        if not force and not self.should_sample(mod, mid):
             return
 
-        record = mem_stats()
-        record.step = self.curr_step
-        record.seq = self.offset()
-        record.module = self.mod_names.get(id(mod), "None")
-        record.stage = stage
+        seq = self.offset()
+        if self._num_logged % self.mem_every == 0:
+            self._last_mem = _mem_values()
+        self._num_logged += 1
+        mem = self._last_mem
 
-        if stage.startswith("pre"):
-            record.time_offset = self.begin_timing(mod, stage)
-            # record.save()
-            self.pending.append(DelayedRecord(record, None))
+        if not stage & 1:  # pre stages are even
+            time_offset, offset_events = self.begin_timing(mod, stage)
+            events = None
         else:
-            record.time_offset, events = self.end_timing(mod, stage)
-            self.pending.append(DelayedRecord(record, events))
+            time_offset, events, offset_events = self.end_timing(mod, stage)
+
+        self.batch.append(
+            self.curr_step,
+            seq,
+            self.mod_names.get(mid, "None"),
+            stage,
+            mem,
+            time_offset,
+            events,
+            offset_events,
+        )
 
     def post_step_hook(self, opt, args, kwargs):
         super().post_step_hook(opt, args, kwargs)
         if not self.finalized:
             self.finalize_discovery()
+            self.init_event_slots(self.num_mods)
         else:
             self.curr_step += 1
             self.next_mod()
 
         # Ensure CUDA operations are complete before processing traces
-        if self.has_cuda and self.pending:
+        if self.has_cuda and self.batch:
             _cuda_sync()
 
-        # process pending records
-        self.pending = [x for x in self.pending if x.save()]
+        # save this step's records; the device is synchronized above, so all
+        # of their events have completed
+        self.batch.flush()
+        self._num_logged = 0
 
         # trace Python variables
         self.trace_variables()
 
         # reset the step start time
         self.step_start = 0
+        self.step_start_event = None
+        self.release_events()
 
 
 def _cuda_sync():
-    import torch
+    _synchronize()
 
-    torch.cuda.synchronize()
 
+def _new_cuda_event():
+    return _Event(enable_timing=True)
 
-def _cuda_event():
-    import torch
 
-    event = torch.cuda.Event(enable_timing=True)
-    event.record()
-    return event
+# live probes, so that set_sampling_mode does not have to scan the heap
+_PROBES = weakref.WeakSet()
 
 
 def set_sampling_mode(mode):
-    import gc
-
-    objs = [obj for obj in gc.get_objects() if isinstance(obj, TorchProbe)]
     try:
-        for obj in objs:
+        for obj in list(_PROBES):
             obj.set_sampling_mode(mode)
     except Exception as e:
         print(f"Error setting mode: {e}")
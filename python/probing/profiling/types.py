@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from enum import IntEnum
 from typing import Any, List
 
 from .torch.step import next_step
@@ -14,49 +15,76 @@ class TensorDef:
         return TensorDef(t.shape, t.dtype)
 
 
-# Global counter for tracking execution order within a step
-MODULE_CALL_OFFSET = 0
-CURRENT_MODULE = None
-CURRENT_STAGE = None
+class Stage(IntEnum):
+    """Hook stages; pre stages are even and each is followed by its post stage."""
+
+    PRE_FWD = 0
+    POST_FWD = 1
+    PRE_BWD = 2
+    POST_BWD = 3
+    PRE_STEP = 4
+    POST_STEP = 5
+
+
+# module-level aliases so the hooks pass a stage with a single global load
+PRE_FWD = Stage.PRE_FWD
+POST_FWD = Stage.POST_FWD
+PRE_BWD = Stage.PRE_BWD
+POST_BWD = Stage.POST_BWD
+PRE_STEP = Stage.PRE_STEP
+POST_STEP = Stage.POST_STEP
+
+# names of the stages as written to the trace tables
+STAGE_NAMES = (
+    "pre forward",
+    "post forward",
+    "pre backward",
+    "post backward",
+    "pre step",
+    "post step",
+)
 
 
 class BaseTracer:
+    def __init__(self, **kwargs):
+        # execution order of hooks within the current step, kept per tracer
+        self._offset = 0
+        self._cur_mod = None
+        self._cur_stage = None
+        super().__init__(**kwargs)
+
     def offset(self):
-        return MODULE_CALL_OFFSET
+        return self._offset
 
     def process_hook(self, module, stage):
-        global MODULE_CALL_OFFSET
-        global CURRENT_MODULE
-        global CURRENT_STAGE
-
-        if CURRENT_MODULE != id(module) or CURRENT_STAGE != stage:
-            MODULE_CALL_OFFSET += 1
-            CURRENT_MODULE = id(module)
-            CURRENT_STAGE = stage
+        mod_id = id(module)
+        if self._cur_mod != mod_id or self._cur_stage != stage:
+            self._offset += 1
+            self._cur_mod = mod_id
+            self._cur_stage = stage
 
     def pre_forward_hook(self, m, i):
-        self.log_module_stage("pre forward", m)
-        self.process_hook(m, "pre forward")
+        self.log_module_stage(PRE_FWD, m)
+        self.process_hook(m, PRE_FWD)
 
     def post_forward_hook(self, m, i, o):
-        self.log_module_stage("post forward", m)
-        self.process_hook(m, "post forward")
+        self.log_module_stage(POST_FWD, m)
+        self.process_hook(m, POST_FWD)
 
     def pre_backward_hook(self, m, i):
-        self.log_module_stage("pre backward", m)
-        self.process_hook(m, "pre backward")
+        self.log_module_stage(PRE_BWD, m)
+        self.process_hook(m, PRE_BWD)
 
     def post_backward_hook(self, m, i, o):
-        self.log_module_stage("post backward", m)
-        self.process_hook(m, "post backward")
+        self.log_module_stage(POST_BWD, m)
+        self.process_hook(m, POST_BWD)
 
     def pre_step_hook(self, optimizer, args, kwargs):
-        self.log_module_stage("pre step", optimizer, force=False)
-        self.process_hook(optimizer, "pre step")
+        self.log_module_stage(PRE_STEP, optimizer, force=False)
+        self.process_hook(optimizer, PRE_STEP)
 
     def post_step_hook(self, optimizer, args, kwargs):
-        self.log_module_stage("post step", optimizer, force=False)
-        self.process_hook(optimizer, "post step")
-        global MODULE_CALL_OFFSET
-        MODULE_CALL_OFFSET = 0
+        self.log_module_stage(POST_STEP, optimizer, force=False)
+        self.process_hook(optimizer, POST_STEP)
+        self._offset = 0
         next_step()
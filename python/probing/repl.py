@@ -4,6 +4,9 @@ from contextlib import redirect_stderr, redirect_stdout
 from types import CodeType
 from typing import Any, Dict, List, Type
 
+from ._compile import compile_cached
+
+
 class DebugConsole(code.InteractiveConsole):
     def resetoutput(self):
         out = self.output
@@ -17,7 +20,7 @@ class DebugConsole(code.InteractiveConsole):
         self, source: str, filename: str = "<input>", symbol: str = "single"
     ) -> bool:
         try:
-            code = self.compile(source, filename, symbol)
+            code = compile_cached(self.compile, source, filename, symbol)
         except (OverflowError, SyntaxError, ValueError):
             # Case 1: wrong code
             self.showsyntaxerror(filename)
@@ -1,5 +1,6 @@
 import ctypes
 import functools
+import inspect
 import json
 import os
 import sys
@@ -42,8 +43,14 @@ class ProbingTracer:
         self.depth = depth
         self.count_calls = 0
         self.count_returns = 0
-        self.watch = watch
+        self.watch = tuple(watch)
         self.watch_impl = {}
+        self._torch = None  # bound on enter, only needed to watch variables
+        self._last_filename = None
+        self._last_internal = False
+        # code object -> watched names local to it, dropped on exit so that
+        # the tracer does not keep code objects alive
+        self._code_names = {}
 
     def on_call(self):
         self.count_calls += 1
@@ -56,19 +63,61 @@ class ProbingTracer:
         return depth > self.depth
 
     def _is_internal_frame(self, frame):
-        return frame.f_code.co_filename.startswith(internal_directories)
+        # consecutive events mostly come from the same file, whose name is
+        # the same str object, so the last answer is reused by identity
+        filename = frame.f_code.co_filename
+        if filename is not self._last_filename:
+            self._last_filename = filename
+            self._last_internal = _is_internal_file(filename)
+        return self._last_internal
+
+    def _watched_names(self, code):
+        """Watched names that can be local variables of ``code``."""
+        names = self._code_names.get(code)
+        if names is None:
+            local_names = _local_names(code)
+            if local_names is None:
+                names = self.watch
+            else:
+                names = [k for k in self.watch if k in local_names]
+            self._code_names[code] = names
+        return names
 
     def __enter__(self):
         tracer_stack = thread_global.__dict__.setdefault("tracer_stack", [])
-        tracer_stack.append(sys.gettrace())
-        sys.settrace(self.trace)
+        if self.watch:
+            if self._torch is None:
+                import torch
+
+                self._torch = torch
+            # watching variables needs line events, only settrace has them
+            tracer_stack.append((sys.settrace, sys.gettrace()))
+            sys.settrace(self.trace)
+        else:
+            # call/return bookkeeping only: setprofile skips line events
+            tracer_stack.append((sys.setprofile, sys.getprofile()))
+            sys.setprofile(self.profile)
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         tracer_stack = thread_global.tracer_stack
-        sys.settrace(tracer_stack.pop())
+        restore, previous = tracer_stack.pop()
+        restore(previous)
+        self._code_names.clear()
+
+    def profile(self, frame: FrameType, event: AnyStr, arg: Any):
+        if event == "call":
+            self.on_call()
+            if self._outof_depth():
+                frame.f_locals["__trace_checkpoint__"] = TracerCheckpoint(
+                    self.on_return, sys.getprofile, sys.setprofile
+                )
+        elif event == "return":
+            # the return of __enter__ itself is reported too, skip it
+            if self.count_calls > self.count_returns:
+                self.on_return()
 
     def trace(self, frame: FrameType, event: AnyStr, arg: Any):
-        import torch
+        torch = self._torch
 
         # print(
         #     f"Event: {event}, Frame: {frame}, Arg: {arg}, name: {frame.f_code.co_name}"
@@ -92,11 +141,15 @@ class ProbingTracer:
             return self.trace
         if event == "return":
             self.on_return()
-            for k in self.watch:
-                if k in frame.f_locals and isinstance(
-                    frame.f_locals[k], FakeProbingTensor
-                ):
-                    frame.f_locals[k] = torch.Tensor(frame.f_locals[k])
+            names = self._watched_names(frame.f_code)
+            if names:
+                f_locals = frame.f_locals
+                dirty = False
+                for k in names:
+                    if isinstance(f_locals.get(k), FakeProbingTensor):
+                        f_locals[k] = torch.Tensor(f_locals[k])
+                        dirty = True
+                if dirty:
                     ctypes.pythonapi.PyFrame_LocalsToFast(
                         ctypes.py_object(frame), ctypes.c_int(0)
                     )
@@ -104,33 +157,59 @@ class ProbingTracer:
         if self._is_internal_frame(frame):
             return None
 
-        for k in self.watch:
-            if (
-                k in frame.f_locals
-                and isinstance(frame.f_locals[k], torch.Tensor)
-                and (not isinstance(frame.f_locals[k], FakeProbingTensor))
-            ):
-                frame.f_locals[k] = ProbingTensor(frame.f_locals[k])
-                ctypes.pythonapi.PyFrame_LocalsToFast(
-                    ctypes.py_object(frame), ctypes.c_int(0)
-                )
-        for k, v in self.watch_impl.items():
-            if k in frame.f_locals and id(frame.f_locals[k]) != v:
-                print(f"probing: variable update {k} = {frame.f_locals[k]}")
-                self.watch_impl[k] = id(frame.f_locals[k])
+        names = self._watched_names(frame.f_code)
+        if not names:
+            return self.trace
+
+        # every frame.f_locals access re-syncs the dict from the fast
+        # locals, so it is read once per event
+        f_locals = frame.f_locals
+        tensor_type = torch.Tensor
+        dirty = False
+        for k in names:
+            v = f_locals.get(k)
+            if isinstance(v, tensor_type) and not isinstance(v, FakeProbingTensor):
+                f_locals[k] = ProbingTensor(v)
+                dirty = True
+        if dirty:
+            ctypes.pythonapi.PyFrame_LocalsToFast(
+                ctypes.py_object(frame), ctypes.c_int(0)
+            )
+        watch_impl = self.watch_impl
+        for k in names:
+            if k in watch_impl and k in f_locals and id(f_locals[k]) != watch_impl[k]:
+                print(f"probing: variable update {k} = {f_locals[k]}")
+                watch_impl[k] = id(f_locals[k])
         return self.trace
 
 
+@functools.lru_cache(maxsize=1024)
+def _is_internal_file(filename):
+    return filename.startswith(internal_directories)
+
+
+def _local_names(code):
+    """Names that can be local to ``code``, or None if its locals are a dict.
+
+    Module and class bodies keep their variables in a plain namespace
+    rather than in the code object's variable tables.
+    """
+    if not code.co_flags & inspect.CO_OPTIMIZED:
+        return None
+    return frozenset(code.co_varnames + code.co_cellvars + code.co_freevars)
+
+
 class TracerCheckpoint:
-    def __init__(self, callback=None):
-        self.trace = sys.gettrace()
+    def __init__(self, callback=None, gettrace=sys.gettrace, settrace=sys.settrace):
+        self.trace = gettrace()
         self.callback = callback
-        sys.settrace(None)
+        self.settrace = settrace
+        settrace(None)
 
     def __del__(self):
         if self.callback:
             self.callback()
-        sys.settrace(self.trace)
+        self.settrace(self.trace)
 
 
 class FakeProbingTensor:
@@ -141,8 +220,22 @@ __ProbingTensor = None
 
 
 def ProbingTensor(*args, **kwargs):
+    cls = __ProbingTensor
+    if cls is None:
+        cls = _make_probing_tensor_type()
+    return cls(*args, **kwargs)
+
+
+def _make_probing_tensor_type():
+    """Define the ``ProbingTensor`` class on first use, once per process."""
     import torch
 
+    tensor_repr = torch.Tensor.__repr__
+    tensor_str = torch.Tensor.__str__
+    # func -> whether calls to it are reported as tensor updates; every torch
+    # op on a watched tensor goes through __torch_function__
+    reported = {}
+
     class _ProbingTensor(torch.Tensor, FakeProbingTensor):
         def __format__(self, format_spec):
             return f"{self.item().__format__(format_spec)}"
@@ -151,13 +244,17 @@ def ProbingTensor(*args, **kwargs):
         def __torch_function__(cls, func, types, args=(), kwargs=None):
             if kwargs is None:
                 kwargs = {}
-            if (
-                func is not torch.Tensor.__repr__
-                # and func is not torch.Tensor.__format__
-                and func is not torch.Tensor.__str__
-                and func.__name__.endswith("_")
-                and not func.__name__.startswith("__")
-            ):
+            report = reported.get(func)
+            if report is None:
+                name = func.__name__
+                report = reported[func] = (
+                    func is not tensor_repr
+                    # and func is not torch.Tensor.__format__
+                    and func is not tensor_str
+                    and name.endswith("_")
+                    and not name.startswith("__")
+                )
+            if report:
                 old_val = f"{args}"
                 ret = super().__torch_function__(func, types, args, kwargs)
                 ret_val = f"{args}"
@@ -168,9 +265,8 @@ def ProbingTensor(*args, **kwargs):
             return super().__torch_function__(func, types, args, kwargs)
 
     global __ProbingTensor
-    if __ProbingTensor is None:
-        __ProbingTensor = _ProbingTensor
-    return __ProbingTensor(*args, **kwargs)
+    __ProbingTensor = _ProbingTensor
+    return _ProbingTensor
 
 
 def list_traceable(prefix=None):
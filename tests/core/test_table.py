@@ -0,0 +1,34 @@
+import sys
+from dataclasses import dataclass
+
+import pytest
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="dataclass slots need 3.10")
+def test_table_on_slotted_dataclass():
+    from probing.core import table
+
+    @table
+    @dataclass(slots=True)
+    class SlottedRow:
+        step: int = 0
+        name: str = ""
+
+    assert not hasattr(SlottedRow(), "__dict__")
+
+    SlottedRow(1, "a").save()
+    SlottedRow.append(SlottedRow(2, "b"))
+    SlottedRow.append_many([SlottedRow(3, "c")])
+    SlottedRow.append_columns([[4], ["d"]])
+
+    rows = [values for _, values in SlottedRow.take(10)]
+    assert rows == [[1, "a"], [2, "b"], [3, "c"], [4, "d"]]
+    SlottedRow.drop()
+
+
+def test_torch_trace_rows_match_python_version():
+    pytest.importorskip("torch")
+    from probing.profiling.torch_probe import TorchTrace, Variables
+
+    for cls in (TorchTrace, Variables):
+        assert hasattr(cls(), "__dict__") == (sys.version_info < (3, 10))
@@ -0,0 +1,46 @@
+import weakref
+
+
+class Item:
+    pass
+
+
+def make_cache(n):
+    items = [Item() for _ in range(n)]
+    return items, {id(x): weakref.ref(x) for x in items}
+
+
+def test_paging_bounds():
+    from probing.inspect.torch import _build_active_list_and_clean_cache
+
+    items, cache = make_cache(10)
+    ids = sorted(cache)
+
+    page, dead = _build_active_list_and_clean_cache(cache, limit=3, offset=0)
+    assert [x["id"] for x in page] == ids[:3]
+    assert not dead
+
+    page, _ = _build_active_list_and_clean_cache(cache, limit=3, offset=8)
+    assert [x["id"] for x in page] == ids[8:]
+
+    page, _ = _build_active_list_and_clean_cache(cache, limit=3, offset=10)
+    assert page == []
+
+    page, _ = _build_active_list_and_clean_cache(cache, limit=0)
+    assert page == []
+
+    page, _ = _build_active_list_and_clean_cache(cache, limit=None, offset=4)
+    assert [x["id"] for x in page] == ids[4:]
+    assert all(x["type"] == "Item" for x in page)
+
+
+def test_paging_drops_dead_refs():
+    from probing.inspect.torch import _build_active_list_and_clean_cache
+
+    items, cache = make_cache(5)
+    dead_id = id(items.pop())
+
+    page, dead = _build_active_list_and_clean_cache(cache, limit=10)
+    assert dead
+    assert dead_id not in cache
+    assert [x["id"] for x in page] == sorted(id(x) for x in items)
@@ -0,0 +1,60 @@
+import copy
+import pickle
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+
+@pytest.fixture
+def registry():
+    from probing.magics import _registry
+
+    _registry.install()
+    yield _registry
+    _registry.uninstall()
+
+
+def test_new_module_is_registered(registry):
+    m = torch.nn.Linear(2, 2)
+    assert registry.module_by_id(id(m)) is m
+    assert any(obj is m for obj in registry.modules())
+
+
+def test_module_without_init_is_found(registry):
+    m = torch.nn.Linear(2, 2)
+    for clone in (copy.deepcopy(m), pickle.loads(pickle.dumps(m))):
+        assert registry.module_by_id(id(clone)) is clone
+        assert any(obj is clone for obj in registry.modules(refresh=True))
+
+
+def test_module_by_id_miss(registry):
+    assert registry.module_by_id(id(object())) is None
+
+
+def test_toplevel_modules(registry):
+    model = torch.nn.Sequential(torch.nn.Linear(2, 2), torch.nn.ReLU())
+    toplevel = registry.toplevel_modules([model, *model.children()])
+    assert toplevel == [model]
+
+
+def test_tensor_refresh(registry):
+    t = torch.zeros(3)
+    assert any(obj is t for obj in registry.tensors(refresh=True))
+
+
+def test_new_tensors_show_up_after_rescan_interval(registry, monkeypatch):
+    registry.tensors()
+    t = torch.zeros(3)
+    monkeypatch.setattr(registry, "_last_tensor_scan", float("-inf"))
+    assert any(obj is t for obj in registry.tensors())
+
+
+def test_uninstall_restores_module_init():
+    from probing.magics import _registry
+
+    orig = torch.nn.Module.__init__
+    _registry.install()
+    assert torch.nn.Module.__init__ is not orig
+    _registry.uninstall()
+    assert torch.nn.Module.__init__ is orig
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("IPython")
+
+
+class Series:
+    shape = (5,)
+    dtype = "int64"
+
+    def __repr__(self):
+        raise AssertionError("data formatted")
+
+
+class Verbose:
+    def __str__(self):
+        return "x" * 1000
+
+
+def test_value_repr_is_bounded():
+    from probing.magics.stack_magic import _get_obj_repr
+
+    def value(obj):
+        return _get_obj_repr(obj, value=True)["value"]
+
+    assert value("text") == "text"
+    assert value(1.5) == "1.5"
+    assert value(list(range(100))) == "[0, 1, 2, 3, 4, ...]"
+    assert value([Series()]) == "[Series(shape=(5,), dtype=int64)]"
+    assert value(Verbose()) == "x" * 150
+
+
+def test_value_repr_summarizes_tensors():
+    torch = pytest.importorskip("torch")
+    from probing.magics.stack_magic import _get_obj_repr
+
+    value = _get_obj_repr({"w": torch.zeros(1000, 1000)}, value=True)["value"]
+    assert value == "{'w': Tensor(shape=(1000, 1000), dtype=torch.float32, device=cpu)}"
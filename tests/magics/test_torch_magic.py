@@ -0,0 +1,34 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("IPython")
+
+
+def test_profiler_starts_when_first_module_never_runs():
+    from probing.magics.torch_magic import TorchMagic
+
+    unused = torch.nn.Linear(4, 4)  # e.g. a loss or a frozen teacher
+    model = torch.nn.Linear(4, 4)
+    p = TorchMagic.install_profiler([unused, model], steps=1)
+    for _ in range(3):
+        model(torch.randn(2, 4))
+
+    assert p._count == 2
+    assert p._hooks == []
+
+
+def test_profiler_steps_once_per_training_step():
+    from probing.magics.torch_magic import TorchMagic
+    from probing.profiling.torch import next_step
+
+    model, loss = torch.nn.Linear(4, 4), torch.nn.Linear(4, 4)
+    p = TorchMagic.install_profiler([loss, model], steps=2)
+    for _ in range(2):
+        loss(model(torch.randn(2, 4)))
+        next_step()
+    assert p._count == 2
+    assert p._hooks
+
+    model(torch.randn(2, 4))
+    assert p._count == 3
+    assert p._hooks == []
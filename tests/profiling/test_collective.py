@@ -0,0 +1,42 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+
+def test_trace_output_keeps_plain_shapes():
+    from probing.profiling.collective.coll import CollectiveTracer, _trace_message
+
+    tracer = CollectiveTracer(verbose=False)
+    info = tracer._extract_tensor_info((torch.zeros(4, 8),), {})
+    tracer.append_trace("all_reduce", 0.0, 0.001, info)
+
+    (row,) = tracer.get_trace_data()
+    assert type(row["tensor_shape"]) is tuple
+    assert row["tensor_shape"] == (4, 8)
+    assert "Shape: (4, 8)," in _trace_message("all_reduce", info, 0.001, 0, [0], 1, 0)
+
+
+def test_tracers_are_not_kept_alive():
+    import gc
+    import weakref
+
+    from probing.profiling.collective.coll import CollectiveTracer
+
+    ref = weakref.ref(CollectiveTracer(verbose=False))
+    gc.collect()
+    assert ref() is None
+
+
+def test_cpu_collectives_are_timed_on_host():
+    import time
+
+    from probing.profiling.collective.coll import CollectiveTracer
+
+    def all_reduce(tensor, op=None, group=None, async_op=False):
+        time.sleep(0.01)
+
+    tracer = CollectiveTracer(verbose=False)
+    tracer._trace_wrapper("all_reduce", all_reduce)(torch.zeros(4))
+
+    (row,) = tracer.get_trace_data()
+    assert row["duration"] >= 0.01
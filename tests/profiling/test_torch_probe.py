@@ -0,0 +1,190 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+
+def wait_for_trace_writer():
+    """Drain the background writer so the rows are visible in the table."""
+    from probing.profiling import torch_probe
+
+    if torch_probe._WRITER is not None:
+        torch_probe._WRITER.close()
+        torch_probe._WRITER = None
+
+
+def traced_rows(cls):
+    wait_for_trace_writer()
+    return [values for _, values in cls.take(100000)]
+
+
+def run_steps(tracer, nlayers=8, steps=4):
+    from probing.profiling.torch import install_hooks, uninstall_hooks
+
+    model = torch.nn.Sequential(*[torch.nn.Linear(4, 4) for _ in range(nlayers)])
+    opt = torch.optim.SGD(model.parameters(), lr=0.1)
+    install_hooks(model, tracer=tracer)
+    install_hooks(opt=opt, tracer=tracer)
+    try:
+        for _ in range(steps):
+            model(torch.randn(2, 4)).sum().backward()
+            opt.step()
+            opt.zero_grad()
+    finally:
+        uninstall_hooks()
+    return model
+
+
+@pytest.fixture
+def torch_trace():
+    from probing.profiling.torch_probe import TorchTrace
+
+    wait_for_trace_writer()
+    TorchTrace.drop()
+    TorchTrace.init_table()
+    return TorchTrace
+
+
+@pytest.mark.parametrize("mode", ["ordered", "random"])
+def test_max_mods_bounds_traced_modules(torch_trace, mode):
+    from probing.profiling.torch_probe import TorchProbe
+
+    tracer = TorchProbe(mode=mode, rate=1.0, max_mods=2)
+    run_steps(tracer)
+
+    assert len(tracer.mod_names) == 2
+    kept = set(tracer.mod_names.values())
+    traced = {row[2] for row in traced_rows(torch_trace)}
+    # the first hook of a step is always logged, it anchors the step's
+    # time offsets; that is the top-level model, which has no name
+    assert traced - kept <= {"None"}
+
+
+def test_register_mod_keeps_module_name_cache_clean():
+    from probing.profiling.torch.module_utils import module_name
+    from probing.profiling.torch_probe import TorchProbe
+
+    tracer = TorchProbe()
+    m = torch.nn.Linear(2, 2)
+    tracer.register_mod(m)
+
+    assert tracer.mod_names[id(m)] == "None"
+    assert module_name(m) is None
+    assert module_name(m, "encoder.proj") == "encoder.proj"
+    assert module_name(m) == "encoder.proj"
+
+
+def test_trace_batch_round_trip(torch_trace):
+    from probing.profiling.torch_probe import TraceBatch
+
+    batch = TraceBatch()
+    batch.append(3, 0, "encoder", 0, (1.0, 2.0, 3.0, 4.0), 0.5, None, None)
+    batch.append(3, 1, "decoder", 1, (5.0, 6.0, 7.0, 8.0), 0.75, None, None)
+    batch.flush()
+    assert len(batch) == 0
+
+    assert traced_rows(torch_trace) == [
+        [3, 0, "encoder", "pre forward", 1.0, 2.0, 3.0, 4.0, 0.5, 0.0],
+        [3, 1, "decoder", "post forward", 5.0, 6.0, 7.0, 8.0, 0.75, 0.0],
+    ]
+
+
+def test_mem_every_reuses_last_stats(torch_trace, monkeypatch):
+    from probing.profiling import torch_probe
+    from probing.profiling.torch_probe import TorchProbe
+
+    calls = []
+
+    def fake_mem_values():
+        calls.append(None)
+        return (float(len(calls)),) * 4
+
+    monkeypatch.setattr(torch_probe, "_mem_values", fake_mem_values)
+    tracer = TorchProbe(mem_every=3)
+    run_steps(tracer)
+
+    # position of each row among the records of its step
+    rows = traced_rows(torch_trace)
+    positions = []
+    for i, row in enumerate(rows):
+        same_step = i > 0 and rows[i - 1][0] == row[0]
+        positions.append(positions[-1] + 1 if same_step else 0)
+
+    assert len(calls) == sum(1 for pos in positions if pos % 3 == 0)
+    assert len(calls) < len(rows)
+    for prev, row, pos in zip(rows, rows[1:], positions[1:]):
+        if pos % 3:
+            assert row[4] == prev[4]
+        else:
+            assert row[4] != prev[4]
+
+
+def test_mem_every_samples_every_step_in_ordered_mode(torch_trace, monkeypatch):
+    from probing.profiling import torch_probe
+    from probing.profiling.torch_probe import TorchProbe
+
+    calls = []
+
+    def fake_mem_values():
+        calls.append(None)
+        return (float(len(calls)),) * 4
+
+    monkeypatch.setattr(torch_probe, "_mem_values", fake_mem_values)
+    tracer = TorchProbe(mode="ordered", mem_every=4)
+    run_steps(tracer, steps=6)
+
+    rows = traced_rows(torch_trace)
+    first_of_step = {}
+    for row in rows:
+        first_of_step.setdefault(row[0], row[4])
+    # every step starts with fresh stats, none carries the previous step's
+    values = list(first_of_step.values())
+    assert len(set(values)) == len(values)
+
+
+def test_trace_writer_keeps_order_and_drains_on_close(torch_trace):
+    from probing.profiling.torch_probe import _TraceWriter
+
+    wait_for_trace_writer()
+    writer = _TraceWriter()
+    for step in range(5):
+        columns = [[step], [0], ["m"], ["pre forward"]] + [[0.0]] * 6
+        writer.put(columns)
+    writer.close()
+
+    assert not writer.thread.is_alive()
+    assert [row[0] for row in traced_rows(torch_trace)] == list(range(5))
+
+
+def test_deepcopy_does_not_share_event_slot():
+    import copy
+    import gc
+
+    from probing.profiling.torch_probe import TorchProbe
+
+    tracer = TorchProbe()
+    m = torch.nn.Linear(2, 2)
+    tracer.register_mod(m)
+    clone = copy.deepcopy(m)
+
+    assert tracer.mod_index == {id(m): 0}
+    assert id(clone) not in tracer.mod_index
+
+    mid = id(m)
+    del m
+    gc.collect()
+    assert mid not in tracer.mod_index
+
+
+def test_module_caches_stay_off_the_module():
+    import copy
+    import pickle
+
+    from probing.profiling.torch.module_utils import module_get_fullname, module_name
+
+    m = torch.nn.Linear(2, 2)
+    module_name(m, "encoder.proj")
+    module_get_fullname(m)
+
+    assert not [k for k in vars(m) if k.startswith("_probing")]
+    assert module_name(copy.deepcopy(m)) is None
+    assert module_name(pickle.loads(pickle.dumps(m))) is None
@@ -0,0 +1,34 @@
+import codeop
+
+
+def test_compile_cache_evicts_least_recently_used(monkeypatch):
+    from probing import _compile
+
+    monkeypatch.setattr(_compile, "_CODE_CACHE", type(_compile._CODE_CACHE)())
+    monkeypatch.setattr(_compile, "_CODE_CACHE_SIZE", 2)
+    compiler = codeop.CommandCompiler()
+
+    hot = _compile.compile_cached(compiler, "x = 1", "<input>", "single")
+    _compile.compile_cached(compiler, "y = 2", "<input>", "single")
+    assert _compile.compile_cached(compiler, "x = 1", "<input>", "single") is hot
+    _compile.compile_cached(compiler, "z = 3", "<input>", "single")
+
+    assert _compile.compile_cached(compiler, "x = 1", "<input>", "single") is hot
+    assert [key[0] for key in _compile._CODE_CACHE] == ["z = 3", "x = 1"]
+
+
+def test_compile_cache_hit_keeps_future_flags():
+    import __future__
+
+    from probing._compile import compile_cached
+
+    source = "from __future__ import annotations"
+    compile_cached(codeop.CommandCompiler(), source, "<input>", "single")
+
+    compiler = codeop.CommandCompiler()
+    compile_cached(compiler, source, "<input>", "single")
+    assert compiler.compiler.flags & __future__.annotations.compiler_flag
+
+    # the annotation is not evaluated once the future import is in effect
+    code = compile_cached(compiler, "x: undefined", "<input>", "single")
+    exec(code, {})
@@ -0,0 +1,41 @@
+import sys
+
+
+def test_tracer_without_watch_uses_setprofile():
+    from probing.trace import ProbingTracer
+
+    seen = {}
+
+    def inner():
+        seen["inner"] = sys.getprofile()
+
+    def outer():
+        seen["outer"] = sys.getprofile()
+        inner()
+        seen["outer_after"] = sys.getprofile()
+
+    trace_before = sys.gettrace()
+    profile_before = sys.getprofile()
+    tracer = ProbingTracer(depth=1)
+    with tracer:
+        outer()
+
+    assert seen["outer"] == tracer.profile
+    # inner is out of depth: profiling is suspended there and resumed after
+    assert seen["inner"] is None
+    assert seen["outer_after"] == tracer.profile
+    # call/return bookkeeping only, no line tracing installed
+    assert sys.gettrace() is trace_before
+    assert sys.getprofile() is profile_before
+
+
+def test_nested_tracers_restore_profile():
+    from probing.trace import ProbingTracer
+
+    profile_before = sys.getprofile()
+    outer, inner = ProbingTracer(depth=1), ProbingTracer(depth=1)
+    with outer:
+        with inner:
+            assert sys.getprofile() == inner.profile
+        assert sys.getprofile() == outer.profile
+    assert sys.getprofile() is profile_before